@@ -1,16 +1,44 @@
-from django.contrib import admin
-from .models import Booking, BookingChangeRequest, BookingCancellationRequest
+from django.contrib import admin, messages
+from django.db import IntegrityError
+from django.http import HttpResponseRedirect
+from .models import (
+    Booking,
+    BookingChangeRequest,
+    BookingCancellationRequest,
+    OutboundEmail,
+    StripeEvent,
+)
 from .views import (
     send_change_approval_email,
     send_change_rejection_email,
-    send_cancellation_approval_email,
-    send_cancellation_rejection_email,
 )
 
 
+class BookingConflictAdminMixin:
+    """
+    Report a save rejected by the PostgreSQL no-overlap constraint as
+    an error message instead of a server error. The admin runs the
+    save in a transaction, so nothing of it is kept.
+    """
+
+    def changeform_view(
+        self, request, object_id=None, form_url="", extra_context=None
+    ):
+        try:
+            return super().changeform_view(
+                request, object_id, form_url, extra_context
+            )
+        except IntegrityError:
+            messages.error(
+                request,
+                "The campervan is not available for the selected dates.",
+            )
+            return HttpResponseRedirect(request.get_full_path())
+
+
 # Register Booking model
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(BookingConflictAdminMixin, admin.ModelAdmin):
     list_display = (
         "user",
         "campervan",
@@ -24,7 +52,9 @@ class BookingAdmin(admin.ModelAdmin):
 
 
 @admin.register(BookingChangeRequest)
-class BookingChangeRequestAdmin(admin.ModelAdmin):
+class BookingChangeRequestAdmin(
+    BookingConflictAdminMixin, admin.ModelAdmin
+):
     list_display = (
         "id",
         "booking",
@@ -65,14 +95,34 @@ class BookingCancellationRequestAdmin(admin.ModelAdmin):
     list_display = ("id", "booking", "status", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("booking__id", "booking__user__username")
+    # Approving or rejecting is handled by BookingCancellationRequest.save()
 
-    def save_model(self, request, obj, form, change):
-        booking = obj.booking
-        # Update the booking if the cancellation request is approved.
-        if obj.status == "Approved":
-            booking.status = "Cancelled"
-            booking.save()
-            send_cancellation_approval_email(booking, obj)
-        elif obj.status == "Rejected":
-            send_cancellation_rejection_email(booking, obj)
-        super().save_model(request, obj, form, change)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status", "created_at")
+    search_fields = ("subject", "recipients")
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "event_id",
+        "type",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("status", "type")
+    search_fields = ("event_id",)
@@ -0,0 +1,223 @@
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, FilteredRelation, OuterRef, Q
+
+from core.caching import bump_cache_version, get_cache_version
+from core.models import Campervan
+from .models import Booking
+
+# Days covered by each campervan's occupancy bitmap (about 18 months)
+HORIZON_DAYS = 549
+
+# Kept short so that a missed invalidation is corrected quickly
+OCCUPANCY_TIMEOUT = 60 * 5
+
+
+def occupancy_cache_key(campervan_id):
+    """
+    Cache key of the campervan's current bitmap. It embeds a version
+    that invalidate_occupancy() bumps, so older bitmaps are never read.
+    """
+    version = get_cache_version(f"occupancy:{campervan_id}")
+    return f"booking:occupancy:{campervan_id}:{version}"
+
+
+def _mark(bits, origin, start_date, end_date):
+    """
+    Set the bits for the days [start_date, end_date), clipped to the
+    bitmap.
+    """
+    first = max((start_date - origin).days, 0)
+    last = min((end_date - origin).days, HORIZON_DAYS)
+    for day in range(first, last):
+        bits[day >> 3] |= 1 << (day & 7)
+
+
+def _booked_periods(campervan_id, start_date, end_date):
+    return Booking.objects.overlapping(
+        campervan_id, start_date, end_date
+    ).values_list("start_date", "end_date")
+
+
+def build_occupancy(campervan_id):
+    """
+    One bit per day from today for HORIZON_DAYS, set where an active
+    booking holds the campervan. Returns None for unknown campervans.
+    """
+    # Take the key before reading the bookings: a booking committed
+    # meanwhile bumps the version, so a bitmap missing it is never read.
+    key = occupancy_cache_key(campervan_id)
+    if not Campervan.objects.filter(pk=campervan_id).exists():
+        return None
+    origin = date.today()
+    bits = bytearray((HORIZON_DAYS + 7) // 8)
+    horizon_end = origin + timedelta(days=HORIZON_DAYS)
+    for start, end in _booked_periods(campervan_id, origin, horizon_end):
+        _mark(bits, origin, start, end)
+    occupancy = {"origin": origin, "bits": bits}
+    cache.set(key, occupancy, OCCUPANCY_TIMEOUT)
+    return occupancy
+
+
+def get_occupancy(campervan_id):
+    occupancy = cache.get(occupancy_cache_key(campervan_id))
+    if occupancy is None or occupancy["origin"] != date.today():
+        occupancy = build_occupancy(campervan_id)
+    return occupancy
+
+
+def invalidate_occupancy(campervan_id):
+    """
+    Drop the campervan's cached bitmap after its bookings changed. Call
+    it once the change is committed (see transaction.on_commit), or a
+    concurrent read can cache the bitmap from before the change.
+    """
+    bump_cache_version(f"occupancy:{campervan_id}")
+
+
+def _free_in_bitmap(occupancy, start_date, end_date):
+    """
+    Whether no bit is set for [start_date, end_date), or None when the
+    range reaches outside the bitmap.
+    """
+    bits, origin = occupancy["bits"], occupancy["origin"]
+    first = (start_date - origin).days
+    last = (end_date - origin).days
+    if first < 0 or last > HORIZON_DAYS:
+        return None
+    return not any(
+        bits[day >> 3] & (1 << (day & 7)) for day in range(first, last)
+    )
+
+
+def _available_in_database(campervan_id, start_date, end_date):
+    availability = fleet_availability([(start_date, end_date)], [campervan_id])
+    if campervan_id not in availability:
+        raise Campervan.DoesNotExist(f"No campervan with id {campervan_id}")
+    return availability[campervan_id][0]
+
+
+def is_available(campervan_id, start_date, end_date):
+    """
+    True if no active booking overlaps [start_date, end_date).
+    Answered from the bitmap when OCCUPANCY_BITMAP is on and the range
+    is inside it, otherwise from the database. Raises
+    Campervan.DoesNotExist for unknown ids.
+    """
+    if not settings.OCCUPANCY_BITMAP:
+        return _available_in_database(campervan_id, start_date, end_date)
+    occupancy = get_occupancy(campervan_id)
+    if occupancy is None:
+        raise Campervan.DoesNotExist(f"No campervan with id {campervan_id}")
+
+    free = _free_in_bitmap(occupancy, start_date, end_date)
+    if free is None:
+        return not Booking.objects.overlapping(
+            campervan_id, start_date, end_date
+        ).exists()
+    return free
+
+
+async def ais_available(campervan_id, start_date, end_date):
+    """
+    Async version of is_available() for the ASGI views.
+    """
+    if not settings.OCCUPANCY_BITMAP:
+        return await sync_to_async(_available_in_database)(
+            campervan_id, start_date, end_date
+        )
+    key = await sync_to_async(occupancy_cache_key)(campervan_id)
+    occupancy = await cache.aget(key)
+    if occupancy is None or occupancy["origin"] != date.today():
+        occupancy = await sync_to_async(build_occupancy)(campervan_id)
+    if occupancy is None:
+        raise Campervan.DoesNotExist(f"No campervan with id {campervan_id}")
+
+    free = _free_in_bitmap(occupancy, start_date, end_date)
+    if free is None:
+        return not await Booking.objects.overlapping(
+            campervan_id, start_date, end_date
+        ).aexists()
+    return free
+
+
+def fleet_availability(ranges, campervan_ids=None):
+    """
+    Availability of the whole fleet (or of campervan_ids) for each
+    (start_date, end_date) range, in a single query.
+    Returns {campervan_id: [available for each range]}.
+    """
+    campervans = Campervan.objects.all()
+    if campervan_ids is not None:
+        campervans = campervans.filter(pk__in=campervan_ids)
+    booked = {
+        f"booked_{i}": Exists(
+            Booking.objects.overlapping(OuterRef("pk"), start, end)
+        )
+        for i, (start, end) in enumerate(ranges)
+    }
+    rows = (
+        campervans.annotate(**booked)
+        .order_by("pk")
+        .values_list("pk", *booked)
+    )
+    return {pk: [not flag for flag in flags] for pk, *flags in rows}
+
+
+def month_calendar(campervan_id, month_start):
+    """
+    Booked and free days of the month starting at month_start, plus the
+    latest updated_at of the bookings in that month, from one query.
+    Returns None for unknown campervans. A deleted booking changes the
+    days but not last_modified, so clients should prefer the ETag.
+    Raises OverflowError for December 9999.
+    """
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    rows = (
+        Campervan.objects.filter(pk=campervan_id)
+        .annotate(
+            month_bookings=FilteredRelation(
+                "bookings",
+                condition=Q(
+                    bookings__start_date__lt=next_month,
+                    bookings__end_date__gt=month_start,
+                ),
+            )
+        )
+        .values_list(
+            "month_bookings__start_date",
+            "month_bookings__end_date",
+            "month_bookings__status",
+            "month_bookings__updated_at",
+        )
+    )
+    booked = set()
+    last_modified = None
+    found = False
+    for start, end, status, updated_at in rows:
+        found = True
+        if start is None:
+            continue  # the campervan has no bookings this month
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+        if status == "Cancelled":
+            continue
+        day = max(start, month_start)
+        while day < min(end, next_month):
+            booked.add(day)
+            day += timedelta(days=1)
+    if not found:
+        return None
+
+    days = [
+        month_start + timedelta(days=i)
+        for i in range((next_month - month_start).days)
+    ]
+    return {
+        "booked": [day.isoformat() for day in days if day in booked],
+        "free": [day.isoformat() for day in days if day not in booked],
+        "last_modified": last_modified,
+    }
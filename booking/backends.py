@@ -0,0 +1,116 @@
+import smtplib
+import threading
+import time
+
+from django.core.mail.backends import smtp
+
+# Reuse an idle connection without probing it for this many seconds
+IDLE_CHECK_AFTER = 10
+# Don't reuse connections the server has most likely dropped by now
+MAX_IDLE = 300
+
+_pool = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"connections_opened": 0, "messages_sent": 0}
+
+
+def connection_stats():
+    """
+    Counters for this worker process, showing how many messages
+    each SMTP+TLS handshake was amortised over.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    opened = stats["connections_opened"]
+    stats["messages_per_connection"] = (
+        stats["messages_sent"] / opened if opened else 0.0
+    )
+    return stats
+
+
+def reset_connection_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def close_pooled_connection():
+    """
+    Quit the SMTP session held for the current thread, if any.
+    """
+    connection = getattr(_pool, "connection", None)
+    _pool.connection = None
+    if connection is None:
+        return
+    try:
+        connection.quit()
+    except (OSError, smtplib.SMTPException):
+        connection.close()
+
+
+def _reusable(connection):
+    idle = time.monotonic() - _pool.last_used
+    if idle > MAX_IDLE:
+        return False
+    if idle <= IDLE_CHECK_AFTER:
+        return True
+    try:
+        return connection.noop()[0] == 250
+    except (OSError, smtplib.SMTPException):
+        return False
+
+
+class PooledEmailBackend(smtp.EmailBackend):
+    """
+    SMTP backend that keeps one authenticated connection per worker
+    thread and reuses it across send_mail() calls and outbox batches,
+    instead of a new SMTP+TLS handshake for every message.
+    """
+
+    def open(self):
+        if self.connection:
+            return False
+
+        key = (self.host, self.port, self.username, self.use_ssl)
+        pooled = getattr(_pool, "connection", None)
+        if pooled is not None:
+            if _pool.key == key and _reusable(pooled):
+                self.connection = pooled
+                return False
+            close_pooled_connection()
+
+        opened = super().open()
+        if opened:
+            _pool.connection = self.connection
+            _pool.key = key
+            _pool.last_used = time.monotonic()
+            _count("connections_opened")
+        return opened
+
+    def close(self):
+        # Only detach, the connection stays open for the next sender.
+        self.connection = None
+
+    def send_messages(self, email_messages):
+        try:
+            sent = super().send_messages(email_messages)
+        except (
+            smtplib.SMTPRecipientsRefused,
+            smtplib.SMTPSenderRefused,
+            smtplib.SMTPDataError,
+        ):
+            # The message was refused, but the session is still usable.
+            raise
+        except OSError:
+            # Don't hand a broken session to the next sender.
+            self.connection = None
+            close_pooled_connection()
+            raise
+        _pool.last_used = time.monotonic()
+        _count("messages_sent", sent)
+        return sent
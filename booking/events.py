@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+from django.core.cache import cache
+
+from .models import Booking
+
+# How long a published status stays readable by other processes
+STATUS_TIMEOUT = 60 * 60
+# Seconds between reads of the shared cache while waiting
+CACHE_POLL_INTERVAL = 1
+# Seconds between database reads, for caches that aren't shared
+# between processes (locmem)
+DATABASE_POLL_INTERVAL = 15
+
+# booking_id -> {(event loop, asyncio.Event)} waiting in this process
+_waiters = {}
+_waiters_lock = threading.Lock()
+
+
+def status_cache_key(booking_id):
+    return f"booking:status:{booking_id}"
+
+
+def _wake(booking_ids):
+    with _waiters_lock:
+        waiters = [
+            waiter
+            for booking_id in booking_ids
+            for waiter in _waiters.get(booking_id, ())
+        ]
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+
+def publish_status(booking_id, status):
+    """
+    Announce a booking's new status to anyone waiting on it.
+    """
+    publish_statuses([booking_id], status)
+
+
+def publish_statuses(booking_ids, status):
+    """
+    Announce the same new status for several bookings at once.
+    """
+    cache.set_many(
+        {status_cache_key(booking_id): status for booking_id in booking_ids},
+        STATUS_TIMEOUT,
+    )
+    _wake(booking_ids)
+
+
+async def next_status(booking_id, status, timeout):
+    """
+    Wait up to timeout seconds for the booking to leave status.
+
+    Returns the new status, status itself on timeout, or None if the
+    booking is gone. Changes published in this process wake the waiter
+    straight away; other processes are picked up from the shared cache
+    within CACHE_POLL_INTERVAL, or from the database within
+    DATABASE_POLL_INTERVAL.
+    """
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+    waiter = (loop, event)
+    with _waiters_lock:
+        _waiters.setdefault(booking_id, set()).add(waiter)
+    try:
+        deadline = loop.time() + timeout
+        next_database_poll = loop.time() + DATABASE_POLL_INTERVAL
+        while True:
+            event.clear()
+            current = await cache.aget(status_cache_key(booking_id))
+            if current is not None and current != status:
+                return current
+            now = loop.time()
+            if now >= next_database_poll:
+                current = await (
+                    Booking.objects.filter(pk=booking_id)
+                    .values_list("status", flat=True)
+                    .afirst()
+                )
+                if current != status:
+                    return current
+                next_database_poll = now + DATABASE_POLL_INTERVAL
+            if now >= deadline:
+                return status
+            try:
+                await asyncio.wait_for(
+                    event.wait(), min(CACHE_POLL_INTERVAL, deadline - now)
+                )
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with _waiters_lock:
+            waiters = _waiters.get(booking_id)
+            waiters.discard(waiter)
+            if not waiters:
+                del _waiters[booking_id]
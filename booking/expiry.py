@@ -0,0 +1,141 @@
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.caching import bump_cache_version
+from .availability import invalidate_occupancy
+from .events import publish_statuses
+from .mail import queue_mass_email
+from .models import Booking
+
+logger = logging.getLogger(__name__)
+
+_scheduler_lock = threading.Lock()
+_scheduler_stop = None
+
+
+def stale_pending_bookings(now=None):
+    """
+    Pending bookings that weren't paid within the hold period, or whose
+    start date has already arrived.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.BOOKING_HOLD_DAYS)
+    return Booking.objects.filter(
+        Q(created_at__lt=cutoff) | Q(start_date__lte=now.date()),
+        status="Pending",
+    )
+
+
+def hold_deadline(booking):
+    """
+    When the expiry sweep may cancel the booking if it is still
+    Pending: at the end of the hold period, or when its start date
+    arrives, whichever comes first.
+    """
+    start = timezone.make_aware(datetime.combine(booking.start_date, time()))
+    return min(
+        booking.created_at + timedelta(days=settings.BOOKING_HOLD_DAYS),
+        start,
+    )
+
+
+def _release_on_commit(expired):
+    def release():
+        # update() skips post_save, so invalidate what it would have.
+        bump_cache_version("bookings")
+        for campervan_id in {booking.campervan_id for booking in expired}:
+            invalidate_occupancy(campervan_id)
+        publish_statuses([booking.pk for booking in expired], "Cancelled")
+
+    transaction.on_commit(release)
+
+
+def expire_batch(batch_size=500, now=None):
+    """
+    Cancel up to batch_size stale Pending bookings with one UPDATE and
+    queue their notifications with one INSERT. Returns the number of
+    bookings expired.
+    """
+    # Imported here: the email helpers live in views, which import models.
+    from .views import reservation_expired_email
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        # skip_locked lets the sweeper run next to checkouts and other
+        # sweepers without waiting on (or expiring) a locked booking.
+        expired = list(
+            stale_pending_bookings(now)
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("user", "campervan")
+            .order_by("id")[:batch_size]
+        )
+        if not expired:
+            return 0
+        Booking.objects.filter(
+            pk__in=[booking.pk for booking in expired]
+        ).update(status="Cancelled", updated_at=now)
+        queue_mass_email(
+            [reservation_expired_email(booking) for booking in expired]
+        )
+        _release_on_commit(expired)
+    return len(expired)
+
+
+def expire_pending_bookings(batch_size=500, now=None):
+    """
+    Expire every stale Pending booking, batch_size rows per transaction.
+    Returns the total number of bookings expired.
+    """
+    total = 0
+    while True:
+        expired = expire_batch(batch_size=batch_size, now=now)
+        total += expired
+        if expired < batch_size:
+            return total
+
+
+def start_expiry_scheduler(interval=None):
+    """
+    Sweep stale reservations every interval seconds (default
+    BOOKING_EXPIRY_INTERVAL) from a daemon thread in this process, for
+    deployments without a separate expire_pending_bookings worker.
+    Does nothing when the interval is 0. Returns the stop event.
+    """
+    global _scheduler_stop
+    interval = interval or settings.BOOKING_EXPIRY_INTERVAL
+    if not interval:
+        return None
+    with _scheduler_lock:
+        if _scheduler_stop is not None:
+            return _scheduler_stop
+        _scheduler_stop = stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                expired = expire_pending_bookings()
+                if expired:
+                    logger.info("Expired %s pending booking(s).", expired)
+            except Exception:
+                logger.exception("Expiring pending bookings failed")
+            finally:
+                close_old_connections()
+
+    threading.Thread(
+        target=run, name="booking-expiry", daemon=True
+    ).start()
+    return stop
+
+
+def stop_expiry_scheduler():
+    global _scheduler_stop
+    with _scheduler_lock:
+        if _scheduler_stop is not None:
+            _scheduler_stop.set()
+            _scheduler_stop = None
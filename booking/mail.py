@@ -0,0 +1,127 @@
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Give up on a message after this many failed delivery attempts
+MAX_ATTEMPTS = 5
+# First retry after one minute, doubling up to one hour
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+def queue_email(subject, message, from_email, recipient_list):
+    """
+    Store an email in the outbox instead of talking to SMTP
+    inside the request. Same arguments as send_mail().
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def queue_mass_email(datatuple):
+    """
+    Queue several emails with a single INSERT. Takes the same
+    (subject, message, from_email, recipient_list) tuples as
+    send_mass_mail().
+    """
+    return OutboundEmail.objects.bulk_create(
+        [
+            OutboundEmail(
+                subject=subject,
+                body=message,
+                from_email=from_email,
+                recipients=list(recipient_list),
+            )
+            for subject, message, from_email, recipient_list in datatuple
+        ]
+    )
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff after the given number of failed attempts.
+    """
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = "Failed"
+        logger.error(
+            "Giving up on email %s after %s attempts: %s",
+            email.id,
+            email.attempts,
+            error,
+        )
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def deliver_queued_emails(batch_size=50, connection=None):
+    """
+    Send up to batch_size due emails over a single SMTP connection.
+    Returns the number of emails handled (sent or rescheduled).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox in parallel
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="Pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        connection = connection or get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error("Could not connect to the mail server: %s", e)
+            for email in batch:
+                _record_failure(email, e, now)
+        else:
+            try:
+                for email in batch:
+                    message = EmailMessage(
+                        email.subject,
+                        email.body,
+                        email.from_email,
+                        email.recipients,
+                        connection=connection,
+                    )
+                    try:
+                        message.send()
+                    except Exception as e:
+                        _record_failure(email, e, now)
+                    else:
+                        email.attempts += 1
+                        email.status = "Sent"
+                        email.sent_at = timezone.now()
+            finally:
+                connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            batch,
+            [
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "last_error",
+                "sent_at",
+            ],
+        )
+    return len(batch)
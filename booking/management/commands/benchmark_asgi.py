@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from booking.models import Booking
+from core.benchmarks import benchmark_database, summarize
+from core.models import Campervan
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the availability and booking status endpoints served "
+        "through the WSGI handler (one thread per in-flight request) and "
+        "the ASGI handler (one event loop), using a throwaway test "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=400,
+            help="Requests per mode (spread over the polled endpoints).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Requests in flight at once.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Worker threads for the WSGI run, like sync workers.",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            urls, user = self.setup_data()
+            wsgi = self.run_wsgi(urls, user, options)
+            asgi = asyncio.run(self.run_asgi(urls, user, options))
+        for mode, result in (("wsgi", wsgi), ("asgi", asgi)):
+            self.stdout.write(
+                f"{mode:>5}: {result['requests_per_second']} req/s, "
+                f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"p99 {result['p99_ms']} ms"
+            )
+        if wsgi["requests_per_second"]:
+            speedup = (
+                asgi["requests_per_second"] / wsgi["requests_per_second"]
+            )
+            self.stdout.write(
+                f"ASGI at concurrency {options['concurrency']}: "
+                f"{speedup:.2f}x"
+            )
+
+    def setup_data(self):
+        user = User.objects.create_user(
+            username="benchmark", password="benchmark"
+        )
+        campervan = Campervan.objects.create(
+            name="Benchmark Campervan",
+            description="Campervan for ASGI benchmarks.",
+            price_per_day=100.00,
+            image="benchmark.jpg",
+            capacity=4,
+            location="Benchmark Location",
+        )
+        start = date.today() + timedelta(days=10)
+        booking = Booking.objects.create(
+            user=user,
+            campervan=campervan,
+            start_date=start,
+            end_date=start + timedelta(days=5),
+            total_price=500.00,
+        )
+        query = (
+            f"?campervan_id={campervan.id}"
+            f"&start_date={start:%Y-%m-%d}"
+            f"&end_date={start + timedelta(days=2):%Y-%m-%d}"
+        )
+        urls = [
+            reverse("check_availability") + query,
+            reverse("check_booking_status", args=[booking.id]),
+        ]
+        return urls, user
+
+    def run_wsgi(self, urls, user, options):
+        local = threading.local()
+
+        def get(i):
+            # One logged-in client per worker thread
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.force_login(user)
+            started = time.perf_counter()
+            local.client.get(urls[i % len(urls)])
+            close_old_connections()
+            return time.perf_counter() - started
+
+        threads = min(options["threads"], options["concurrency"])
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(get, range(options["requests"])))
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, urls, user, options):
+        client = AsyncClient()
+        await asyncio.to_thread(client.force_login, user)
+        in_flight = asyncio.Semaphore(options["concurrency"])
+
+        async def get(i):
+            async with in_flight:
+                started = time.perf_counter()
+                await client.get(urls[i % len(urls)])
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(get(i) for i in range(options["requests"]))
+        )
+        return summarize(latencies, time.perf_counter() - started)
@@ -0,0 +1,120 @@
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from booking.models import Booking
+from core.benchmarks import benchmark_database, summarize
+from core.models import Campervan
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/sec of the booking views with persistent "
+        "database connections on and off, using a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=300,
+            help="Requests per mode (spread over the booking views).",
+        )
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            default=settings.DB_CONN_MAX_AGE or 600,
+            help="CONN_MAX_AGE used for the pooled run.",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            urls, client = self.setup_data()
+            results = {}
+            for mode, max_age in (
+                ("off", 0),
+                ("persistent", options["conn_max_age"]),
+            ):
+                results[mode] = self.run(
+                    client, urls, options["requests"], max_age
+                )
+                self.stdout.write(
+                    f"{mode:>10}: "
+                    f"{results[mode]['requests_per_second']} req/s, "
+                    f"p95 {results[mode]['p95_ms']} ms, "
+                    f"{results[mode]['connections_opened']} connection(s)"
+                )
+
+        off = results["off"]["requests_per_second"]
+        if off:
+            speedup = results["persistent"]["requests_per_second"] / off
+            self.stdout.write(f"Persistent connections: {speedup:.2f}x")
+
+    def setup_data(self):
+        user = User.objects.create_user(
+            username="benchmark", password="benchmark"
+        )
+        campervan = Campervan.objects.create(
+            name="Benchmark Campervan",
+            description="Campervan for connection benchmarks.",
+            price_per_day=100.00,
+            image="benchmark.jpg",
+            capacity=4,
+            location="Benchmark Location",
+        )
+        start = date.today() + timedelta(days=10)
+        booking = Booking.objects.create(
+            user=user,
+            campervan=campervan,
+            start_date=start,
+            end_date=start + timedelta(days=5),
+            total_price=500.00,
+        )
+        client = Client()
+        client.force_login(user)
+        query = (
+            f"?campervan_id={campervan.id}"
+            f"&start_date={start:%Y-%m-%d}"
+            f"&end_date={start + timedelta(days=2):%Y-%m-%d}"
+        )
+        urls = [
+            reverse("check_availability") + query,
+            reverse("check_booking_status", args=[booking.id]),
+            reverse("booking_details", args=[booking.id]),
+        ]
+        return urls, client
+
+    def run(self, client, urls, requests, max_age):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connection.settings_dict["CONN_HEALTH_CHECKS"] = max_age > 0
+
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        latencies = []
+        started = time.perf_counter()
+        try:
+            for i in range(requests):
+                request_started = time.perf_counter()
+                # The test client skips the close_old_connections()
+                # handlers the WSGI handler runs around each request.
+                close_old_connections()
+                client.get(urls[i % len(urls)])
+                close_old_connections()
+                latencies.append(time.perf_counter() - request_started)
+        finally:
+            connection_created.disconnect(count)
+        result = summarize(latencies, time.perf_counter() - started)
+        result["connections_opened"] = len(opened)
+        return result
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking.expiry import expire_pending_bookings
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel Pending bookings that weren't paid within the hold "
+        "period and queue the expiry emails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Maximum number of bookings cancelled per UPDATE.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=300.0,
+            help="Seconds to wait between sweeps.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            if options["loop"]:
+                # Drop connections that broke or outlived CONN_MAX_AGE
+                # while idle, as the request handler does per request.
+                close_old_connections()
+            expired = expire_pending_bookings(
+                batch_size=options["batch_size"]
+            )
+            self.stdout.write(f"Expired {expired} pending booking(s).")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply recorded Stripe webhook events to bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of events processed per poll.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new events instead of exiting.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when no events are pending.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            if options["loop"]:
+                # Drop connections that broke or outlived CONN_MAX_AGE
+                # while idle, as the request handler does per request.
+                close_old_connections()
+            handled = process_pending_events(batch_size=batch_size)
+            if handled:
+                self.stdout.write(f"Processed {handled} Stripe event(s).")
+            if handled < batch_size:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
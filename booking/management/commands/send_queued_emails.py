@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking.backends import close_pooled_connection, connection_stats
+from booking.mail import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of emails sent per SMTP connection.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when the outbox is empty.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        try:
+            while True:
+                if options["loop"]:
+                    # Drop connections that broke or outlived CONN_MAX_AGE
+                    # while idle, as the request handler does per request.
+                    close_old_connections()
+                handled = deliver_queued_emails(batch_size=batch_size)
+                if handled:
+                    self.stdout.write(
+                        f"Processed {handled} queued email(s). "
+                        + self.format_stats()
+                    )
+                if handled < batch_size:
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+        finally:
+            close_pooled_connection()
+
+    def format_stats(self):
+        stats = connection_stats()
+        return (
+            f"SMTP connections opened: {stats['connections_opened']}, "
+            f"messages sent: {stats['messages_sent']}, "
+            f"messages per connection: "
+            f"{stats['messages_per_connection']:.1f}"
+        )
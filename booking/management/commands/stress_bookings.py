@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from booking.models import Booking
+from booking.services import (
+    BookingConflict,
+    booking_stats,
+    create_booking,
+    reset_booking_stats,
+)
+from core.benchmarks import benchmark_database, summarize
+from core.models import Campervan
+
+
+class Command(BaseCommand):
+    help = (
+        "Create bookings from several threads at once through the "
+        "booking service and report throughput, conflicts and retries, "
+        "using a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="Thread counts to run, one run each.",
+        )
+        parser.add_argument(
+            "--campervans",
+            type=int,
+            default=8,
+            help="Campervans the bookings are spread over.",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=25,
+            help="Booking attempts per thread.",
+        )
+        parser.add_argument(
+            "--overlap",
+            action="store_true",
+            help="Let threads compete for the same dates.",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            users = User.objects.bulk_create(
+                [
+                    User(username=f"stress{i}")
+                    for i in range(max(options["threads"]))
+                ]
+            )
+            campervans = [
+                Campervan.objects.create(
+                    name=f"Stress Campervan {i}",
+                    description="Campervan for booking stress tests.",
+                    price_per_day=100.00,
+                    image="stress.jpg",
+                    capacity=4,
+                    location="Stress Location",
+                )
+                for i in range(options["campervans"])
+            ]
+            for threads in options["threads"]:
+                Booking.objects.all().delete()
+                result = self.run(threads, users, campervans, options)
+                self.stdout.write(
+                    f"{threads:>3} thread(s): "
+                    f"{result['requests_per_second']} bookings/s, "
+                    f"p95 {result['p95_ms']} ms, "
+                    f"{result['created']} created, "
+                    f"{result['conflicts']} conflicts, "
+                    f"{result['retries']} retries, "
+                    f"{result['failures']} failures, "
+                    f"{result['double_bookings']} double bookings"
+                )
+
+    def run(self, threads, users, campervans, options):
+        reset_booking_stats()
+        connection.close()
+        barrier = threading.Barrier(threads)
+        latencies = []
+        latencies_lock = threading.Lock()
+        first_day = date.today() + timedelta(days=10)
+
+        def book(worker):
+            timings = []
+            try:
+                barrier.wait()
+                for n in range(options["bookings"]):
+                    # Without --overlap every thread walks its own weeks.
+                    slot = n if options["overlap"] else n * threads + worker
+                    campervan = campervans[slot % len(campervans)]
+                    start = first_day + timedelta(
+                        weeks=slot // len(campervans)
+                    )
+                    started = time.perf_counter()
+                    try:
+                        create_booking(
+                            campervan,
+                            users[worker],
+                            start,
+                            start + timedelta(days=7),
+                        )
+                    except BookingConflict:
+                        pass
+                    timings.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+                with latencies_lock:
+                    latencies.extend(timings)
+
+        workers = [
+            threading.Thread(target=book, args=(worker,))
+            for worker in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        result = summarize(latencies, time.perf_counter() - started)
+        result.update(booking_stats())
+        result["double_bookings"] = self.count_double_bookings()
+        return result
+
+    def count_double_bookings(self):
+        return sum(
+            Booking.objects.overlapping(
+                booking.campervan_id, booking.start_date, booking.end_date
+            )
+            .exclude(pk=booking.pk)
+            .exists()
+            for booking in Booking.objects.all()
+        )
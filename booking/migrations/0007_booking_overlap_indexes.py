@@ -0,0 +1,78 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+def check_no_overlaps(schema_editor):
+    """
+    Fail with the conflicting booking ids, rather than a bare
+    constraint error, if active bookings already overlap.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT a.id, b.id FROM booking_booking a "
+            "JOIN booking_booking b ON a.campervan_id = b.campervan_id "
+            "AND a.id < b.id "
+            "AND a.start_date < b.end_date AND b.start_date < a.end_date "
+            "WHERE a.status <> 'Cancelled' AND b.status <> 'Cancelled' "
+            "ORDER BY a.id, b.id LIMIT 20"
+        )
+        pairs = cursor.fetchall()
+    if pairs:
+        raise RuntimeError(
+            "Cannot add the booking_no_overlap constraint: these active "
+            "bookings overlap (first 20 pairs): "
+            + ", ".join(f"#{a} and #{b}" for a, b in pairs)
+            + ". Cancel or move one booking of each pair, then migrate "
+            "again."
+        )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    """
+    PostgreSQL only: GiST index over the booked daterange that also
+    rejects overlapping active bookings for the same campervan.
+    SQLite relies on the B-tree indexes above.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    check_no_overlaps(schema_editor)
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE booking_booking "
+        "ADD CONSTRAINT booking_no_overlap "
+        "EXCLUDE USING gist ("
+        "campervan_id WITH =, "
+        "daterange(start_date, end_date, '[)') WITH &&"
+        ") WHERE (status <> 'Cancelled')"
+    )
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE booking_booking "
+        "DROP CONSTRAINT IF EXISTS booking_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_alter_booking_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['campervan', 'start_date', 'end_date', 'status'], name='booking_overlap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['start_date', 'end_date'], name='booking_period_idx'),
+        ),
+        migrations.RunPython(
+            add_exclusion_constraint, remove_exclusion_constraint
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['created_at'], name='booking_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_booking_pending_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='checkout_session_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
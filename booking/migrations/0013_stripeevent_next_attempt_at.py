@@ -0,0 +1,27 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_booking_checkout_session_id'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stripeevent',
+            name='stripe_event_due_idx',
+        ),
+        migrations.AddField(
+            model_name='stripeevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='stripeevent',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='stripe_event_due_idx'),
+        ),
+    ]
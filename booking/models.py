@@ -1,9 +1,46 @@
 # Handles details about bookings
-from django.db import models
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from core.models import Campervan
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
+
+
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        """
+        Bookings that still block the campervan (i.e. not cancelled).
+        """
+        return self.exclude(status="Cancelled")
+
+    def overlapping(self, campervan, start_date, end_date):
+        """
+        Active bookings overlapping the half-open range
+        [start_date, end_date) for a campervan (instance, id or OuterRef).
+        Pass campervan=None to search the whole fleet.
+        """
+        bookings = self.active()
+        if campervan is not None:
+            bookings = bookings.filter(campervan=campervan)
+
+        if connections[self.db].vendor == "postgresql":
+            # Match the daterange expression of the GiST exclusion
+            # constraint so PostgreSQL can answer from that index.
+            from django.contrib.postgres.fields import DateRangeField
+            from django.db.backends.postgresql.psycopg_any import DateRange
+
+            return bookings.alias(
+                booked_period=models.Func(
+                    models.F("start_date"),
+                    models.F("end_date"),
+                    models.Value("[)"),
+                    function="daterange",
+                    output_field=DateRangeField(),
+                )
+            ).filter(booked_period__overlap=DateRange(start_date, end_date))
+
+        return bookings.filter(
+            start_date__lt=end_date, end_date__gt=start_date
+        )
 
 
 class Booking(models.Model):
@@ -26,12 +63,101 @@ class Booking(models.Model):
         max_length=10, choices=STATUS_CHOICES, default="Pending"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # The latest Stripe checkout session opened for this booking; only
+    # its expiry releases the booking.
+    checkout_session_id = models.CharField(max_length=255, blank=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers the per-campervan overlap check
+            models.Index(
+                fields=["campervan", "start_date", "end_date", "status"],
+                name="booking_overlap_idx",
+            ),
+            # Covers fleet-wide date filters (campervan_list)
+            models.Index(
+                fields=["start_date", "end_date"],
+                name="booking_period_idx",
+            ),
+            # Covers the expiry sweep over unpaid reservations
+            models.Index(
+                fields=["created_at"],
+                name="booking_pending_idx",
+                condition=models.Q(status="Pending"),
+            ),
+        ]
+
+    # (campervan_id, start_date, end_date) as last read from / written to
+    # the database, so signal handlers know which dates a save moved.
+    _saved_period = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        period = tuple(
+            instance.__dict__.get(name)
+            for name in ("campervan_id", "start_date", "end_date")
+        )
+        if None not in period:
+            instance._saved_period = period
+        return instance
 
     def __str__(self):
         return f"Booking by {self.user} for {self.campervan} from {self.start_date} to {self.end_date}"   #noqa
 
 
 # User requests changes related to a booking
+class DayCount(models.Func):
+    """
+    Whole days between two date expressions (end - start).
+    """
+
+    function = "DATEDIFF"  # MySQL / MariaDB: DATEDIFF(end, start)
+    output_field = models.IntegerField()
+
+    def __init__(self, start, end, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            function="julianday",
+            template="CAST(%(function)s(%(expressions)s) AS integer)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # date - date is already an integer number of days.
+        return self.as_sql(
+            compiler,
+            connection,
+            template="(%(expressions)s)",
+            arg_joiner=" - ",
+            **extra_context,
+        )
+
+
+class BookingChangeRequestQuerySet(models.QuerySet):
+    def with_new_total_price(self):
+        """
+        Annotate the price of the requested dates, computed in SQL.
+        """
+        return self.annotate(
+            new_total_price=models.ExpressionWrapper(
+                DayCount("requested_start_date", "requested_end_date")
+                * models.F("booking__campervan__price_per_day"),
+                output_field=models.DecimalField(
+                    max_digits=10, decimal_places=2
+                ),
+            )
+        )
+
+
 class BookingChangeRequest(models.Model):
     STATUS_CHOICES = [
         ("Pending", "Pending"),
@@ -49,6 +175,8 @@ class BookingChangeRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BookingChangeRequestQuerySet.as_manager()
+
 
 def __str__(self):
     return f"Change Request for Booking {self.booking.id} ({self.status})"
@@ -74,28 +202,98 @@ class BookingCancellationRequest(models.Model):
     def __str__(self):
         return f"Cancellation Request for Booking {self.booking.id} ({self.status})"   #noqa
 
+    # Status as last read from / written to the database, so a
+    # transition can be detected without fetching the row again.
+    _saved_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get("status")
+        return instance
+
     # Ensures that status updates beeing saved
     def save(self, *args, **kwargs):
-        if self.pk:
-            previous = BookingCancellationRequest.objects.get(pk=self.pk)
-            if previous.status != self.status:
-                if self.status == "Approved":
-                    self.booking.status = "Cancelled"
-                    self.booking.save()
-        super().save(*args, **kwargs)
+        from .services import apply_cancellation_decision
 
+        previous_status = self._saved_status
+        if self._state.adding:
+            # New requests start out Pending, so one added as Approved
+            # or Rejected (e.g. in the admin) is applied right away.
+            previous_status = "Pending"
+        elif previous_status is None:
+            previous_status = (
+                BookingCancellationRequest.objects.filter(pk=self.pk)
+                .values_list("status", flat=True)
+                .first()
+            )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_status is not None:
+                apply_cancellation_decision(self, previous_status)
+        self._saved_status = self.status
 
-@receiver(pre_save, sender=BookingCancellationRequest)
-def update_booking_status_on_cancellation(sender, instance, **kwargs):
-    """
-    Check if status has changed from "Approved" to "Cancelled"
-    """
-    if instance.pk:
-        # Load the initial status from DB
-        previous = BookingCancellationRequest.objects.get(pk=instance.pk)
-        if (
-            previous.status != instance.status
-            and instance.status == "Approved"
-        ):
-            instance.booking.status = "Cancelled"
-            instance.booking.save()
+
+# Outgoing emails waiting to be delivered by the send_queued_emails worker
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ("Pending", "Pending"),
+        ("Sent", "Sent"),
+        ("Failed", "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="Pending"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"  # noqa
+
+
+# Stripe webhook events, recorded once per event id and
+# applied by the process_stripe_events worker
+class StripeEvent(models.Model):
+    STATUS_CHOICES = [
+        ("Pending", "Pending"),
+        ("Processed", "Processed"),
+        ("Failed", "Failed"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="Pending"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="stripe_event_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id}, {self.status})"
@@ -0,0 +1,187 @@
+import random
+import threading
+import time
+from functools import partial
+
+from django.db import (
+    IntegrityError,
+    OperationalError,
+    router,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from core.caching import bump_cache_version
+from .availability import invalidate_occupancy
+from .events import publish_status
+from .models import Booking, Campervan
+
+# Attempts before a booking that keeps hitting lock errors gives up
+MAX_BOOKING_ATTEMPTS = 10
+# Base delay (seconds) of the jittered exponential backoff between them
+BOOKING_RETRY_DELAY = 0.01
+
+_stats_lock = threading.Lock()
+_stats = {"created": 0, "conflicts": 0, "retries": 0, "failures": 0}
+
+
+class BookingConflict(Exception):
+    """
+    The campervan is already booked for (part of) the requested dates.
+    """
+
+
+def booking_stats():
+    """
+    Counters for this worker process: bookings created, requests
+    rejected as double bookings, retried lock/constraint errors and
+    requests that ran out of attempts.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_booking_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _lock_campervan(campervan_id, using):
+    """
+    Take the write lock on the campervan row for the rest of the
+    transaction, so bookings for the same van are serialized while
+    bookings for different vans proceed in parallel.
+    """
+    campervans = Campervan.objects.using(using).filter(pk=campervan_id)
+    if transaction.get_connection(using).features.has_select_for_update:
+        locked = campervans.select_for_update().values_list("pk")
+        if not locked.exists():
+            raise Campervan.DoesNotExist
+    # SQLite has no row locks; a no-op UPDATE takes the database write
+    # lock up front instead of upgrading to it after the overlap check.
+    elif not campervans.update(id=F("id")):
+        raise Campervan.DoesNotExist
+
+
+def _insert_booking(campervan, user, start_date, end_date, using):
+    with transaction.atomic(using=using):
+        _lock_campervan(campervan.pk, using)
+        if (
+            Booking.objects.using(using)
+            .overlapping(campervan.pk, start_date, end_date)
+            .exists()
+        ):
+            raise BookingConflict
+        return Booking.objects.using(using).create(
+            campervan=campervan,
+            user=user,
+            start_date=start_date,
+            end_date=end_date,
+            total_price=(end_date - start_date).days
+            * campervan.price_per_day,
+            status="Pending",
+        )
+
+
+def create_booking(campervan, user, start_date, end_date):
+    """
+    Reserve campervan for [start_date, end_date) as a Pending booking.
+
+    The overlap check and the insert run in one transaction holding the
+    campervan row lock. A deadlock, "database is locked" error or a hit
+    on the PostgreSQL no-overlap constraint rolls the attempt back and
+    retries it with backoff; the retried overlap check then either
+    succeeds or raises BookingConflict.
+    """
+    using = router.db_for_write(Booking)
+    for attempt in range(1, MAX_BOOKING_ATTEMPTS + 1):
+        try:
+            booking = _insert_booking(
+                campervan, user, start_date, end_date, using
+            )
+        except BookingConflict:
+            _count("conflicts")
+            raise
+        except (IntegrityError, OperationalError):
+            if attempt == MAX_BOOKING_ATTEMPTS:
+                _count("failures")
+                raise
+            _count("retries")
+            time.sleep(
+                BOOKING_RETRY_DELAY * 2 ** (attempt - 1) * random.random()
+            )
+        else:
+            _count("created")
+            return booking
+
+
+def reconfirm_booking(booking):
+    """
+    Confirm a cancelled booking again, for a payment that arrived after
+    it was cancelled. Takes the campervan row lock in the caller's
+    transaction; returns False if another booking holds the dates now.
+    """
+    using = router.db_for_write(Booking)
+    _lock_campervan(booking.campervan_id, using)
+    taken = (
+        Booking.objects.using(using)
+        .overlapping(
+            booking.campervan_id, booking.start_date, booking.end_date
+        )
+        .exclude(pk=booking.pk)
+    )
+    if taken.exists():
+        return False
+    booking.status = "Confirmed"
+    booking.save(update_fields=["status", "updated_at"])
+    return True
+
+
+def _after_cancellation_decision(booking_id, cancellation_request):
+    # Imported here: the email helpers live in views, which import models.
+    from .views import (
+        send_cancellation_approval_email,
+        send_cancellation_rejection_email,
+    )
+
+    booking = Booking.objects.select_related("user").get(pk=booking_id)
+    if cancellation_request.status == "Approved":
+        # The UPDATE skipped post_save, so invalidate what it would have.
+        bump_cache_version("bookings")
+        invalidate_occupancy(booking.campervan_id)
+        publish_status(booking.pk, booking.status)
+        send_cancellation_approval_email(booking, cancellation_request)
+    else:
+        send_cancellation_rejection_email(booking, cancellation_request)
+
+
+def apply_cancellation_decision(cancellation_request, previous_status):
+    """
+    Side effects of a cancellation request moving from previous_status
+    to its current status: approval cancels the booking with a single
+    UPDATE, and once the transaction commits the cached listings and
+    occupancy bitmap are invalidated and the user is emailed.
+    """
+    status = cancellation_request.status
+    if status == previous_status or status == "Pending":
+        return
+
+    if status == "Approved":
+        Booking.objects.filter(pk=cancellation_request.booking_id).exclude(
+            status="Cancelled"
+        ).update(status="Cancelled", updated_at=timezone.now())
+
+    transaction.on_commit(
+        partial(
+            _after_cancellation_decision,
+            cancellation_request.booking_id,
+            cancellation_request,
+        )
+    )
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Campervan
+from .availability import invalidate_occupancy
+from .events import publish_status
+from .models import Booking
+
+
+def _invalidate_on_commit(campervan_id):
+    transaction.on_commit(lambda: invalidate_occupancy(campervan_id))
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy_on_save(sender, instance, **kwargs):
+    """
+    Drop the occupancy bitmaps of the old and new campervan once the
+    save is committed.
+    """
+    previous = instance._saved_period
+    if previous and previous[0] != instance.campervan_id:
+        _invalidate_on_commit(previous[0])
+    _invalidate_on_commit(instance.campervan_id)
+    instance._saved_period = (
+        instance.campervan_id,
+        instance.start_date,
+        instance.end_date,
+    )
+    # Push the status to any open status streams
+    booking_id, status = instance.pk, instance.status
+    transaction.on_commit(lambda: publish_status(booking_id, status))
+
+
+@receiver(post_delete, sender=Booking)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.campervan_id)
+
+
+@receiver(post_delete, sender=Campervan)
+def drop_occupancy(sender, instance, **kwargs):
+    invalidate_occupancy(instance.pk)
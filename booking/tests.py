@@ -1,13 +1,53 @@
-from django.test import TestCase
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from booking.availability import (
+    HORIZON_DAYS,
+    ais_available,
+    get_occupancy,
+    is_available,
+    occupancy_cache_key,
+)
+from booking.backends import (
+    close_pooled_connection,
+    connection_stats,
+    reset_connection_stats,
+)
+from booking.events import publish_status, status_cache_key
+from booking.expiry import expire_pending_bookings
+from booking.mail import (
+    MAX_ATTEMPTS,
+    deliver_queued_emails,
+    queue_mass_email,
+)
+from booking.services import (
+    BookingConflict,
+    booking_stats,
+    create_booking,
+    reset_booking_stats,
+)
 from booking.models import (
     Booking,
     BookingChangeRequest,
     BookingCancellationRequest,
+    OutboundEmail,
 )
+from core.caching import get_cache_version
 from core.models import Campervan
 from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
 
 
 class CancelBookingTest(TestCase):
@@ -150,6 +190,30 @@ class DateChangeTest(TestCase):
         self.assertEqual(self.booking.total_price, expected_price)
         self.assertRedirects(response, reverse("my_bookings"))
 
+    def test_edit_booking_lost_race(self):
+        """Test that a no-overlap constraint hit shows the
+        "not available" error instead of a server error."""
+        new_start = date.today() + timedelta(days=11)
+        with patch.object(Booking, "save", side_effect=IntegrityError):
+            response = self.client.post(
+                reverse("edit_booking", args=[self.booking.id]),
+                {
+                    "start_date": new_start.strftime("%Y-%m-%d"),
+                    "end_date": (new_start + timedelta(days=6)).strftime(
+                        "%Y-%m-%d"
+                    ),
+                },
+            )
+        self.assertRedirects(
+            response,
+            reverse("edit_booking", args=[self.booking.id]),
+            fetch_redirect_response=False,
+        )
+        self.assertIn(
+            "not available",
+            str(list(response.wsgi_request._messages)[-1]),
+        )
+
     def test_edit_booking_invalid_dates(self):
         """Test that booking can't be updated if end date < start date."""
         new_start = date.today() + timedelta(days=16)
@@ -225,6 +289,35 @@ class DateChangeTest(TestCase):
             ).exists()
         )
 
+    @override_settings(DEFAULT_ADMIN_EMAIL="admin@example.com")
+    def test_date_change_request_emails_are_queued_together(self):
+        """Test that the user's receipt and the admin notification
+        are queued in one batch."""
+        self.user.email = "datechanger@example.com"
+        self.user.save()
+        self.booking.status = "Confirmed"
+        self.booking.save()
+        new_start = date.today() + timedelta(days=20)
+        with patch(
+            "booking.views.queue_mass_email", wraps=queue_mass_email
+        ) as queue:
+            self.client.post(
+                reverse("request_date_change", args=[self.booking.id]),
+                {
+                    "start_date": new_start.strftime("%Y-%m-%d"),
+                    "end_date": (new_start + timedelta(days=5)).strftime(
+                        "%Y-%m-%d"
+                    ),
+                },
+            )
+        queue.assert_called_once()
+        self.assertEqual(
+            sorted(
+                email.recipients[0] for email in OutboundEmail.objects.all()
+            ),
+            ["admin@example.com", "datechanger@example.com"],
+        )
+
 
 class AdminActionTest(TestCase):
     def setUp(self):
@@ -291,6 +384,40 @@ class AdminActionTest(TestCase):
         self.assertEqual(self.bcr.status, "Approved")
         self.assertRedirects(response, reverse("view_change_requests"))
 
+    def test_approve_date_change_request_lost_race(self):
+        """Test that a no-overlap constraint hit is reported, not
+        raised, and leaves the request pending."""
+        url = reverse("approve_change_request", args=[self.bcr.id])
+        with patch.object(Booking, "save", side_effect=IntegrityError):
+            response = self.client.get(url, follow=True)
+        self.assertRedirects(response, reverse("view_change_requests"))
+        self.assertContains(response, "The requested dates are unavailable")
+        self.bcr.refresh_from_db()
+        self.assertEqual(self.bcr.status, "Pending")
+
+    def test_admin_booking_save_lost_race(self):
+        """Test that the admin shows a constraint hit as an error."""
+        self.staff.is_superuser = True
+        self.staff.save()
+        url = reverse("admin:booking_booking_change", args=[self.booking.id])
+        with patch.object(Booking, "save", side_effect=IntegrityError):
+            response = self.client.post(
+                url,
+                {
+                    "user": self.user.id,
+                    "campervan": self.campervan.id,
+                    "start_date": self.booking.start_date.isoformat(),
+                    "end_date": self.booking.end_date.isoformat(),
+                    "total_price": "500.00",
+                    "status": "Confirmed",
+                },
+            )
+        self.assertRedirects(response, url)
+        self.assertIn(
+            "not available",
+            str(list(response.wsgi_request._messages)[0]),
+        )
+
     def test_reject_date_change_request(self):
         """Test that an admin can reject a date change request."""
         url = reverse("reject_change_request", args=[self.bcr.id])
@@ -299,6 +426,22 @@ class AdminActionTest(TestCase):
         self.assertEqual(self.bcr.status, "Rejected")
         self.assertRedirects(response, reverse("view_change_requests"))
 
+    def test_view_change_requests_prices_in_sql(self):
+        """Test that the review page prices requests without
+        a query per request."""
+        for offset in (20, 30, 40):
+            self.booking.change_requests.create(
+                requested_start_date=date.today() + timedelta(days=offset),
+                requested_end_date=date.today() + timedelta(days=offset + 3),
+            )
+        # Session, staff user, count and change requests.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("view_change_requests"))
+        requests = list(response.context["change_requests"])
+        self.assertEqual(requests[0], self.bcr)
+        self.assertEqual(requests[0].new_total_price, 500)
+        self.assertEqual(requests[1].new_total_price, 300)
+
     def test_approve_cancellation_request(self):
         """Test that an admin can approve a cancellation request
         and that the booking becomes cancelled."""
@@ -307,6 +450,31 @@ class AdminActionTest(TestCase):
         self.booking.refresh_from_db()
         self.assertEqual(self.booking.status, "Cancelled")
 
+    def test_admin_adds_approved_cancellation_request(self):
+        """Test that a request added in the admin as Approved cancels
+        the booking, and listings are invalidated only on commit."""
+        self.staff.is_superuser = True
+        self.staff.save()
+        version = get_cache_version("bookings")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("admin:booking_bookingcancellationrequest_add"),
+                {"booking": self.booking.id, "status": "Approved"},
+            )
+            self.assertEqual(get_cache_version("bookings"), version)
+        self.assertRedirects(
+            response,
+            reverse("admin:booking_bookingcancellationrequest_changelist"),
+        )
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Cancelled")
+        self.assertNotEqual(get_cache_version("bookings"), version)
+        self.assertTrue(
+            OutboundEmail.objects.filter(
+                subject="Your cancellation request has been approved"
+            ).exists()
+        )
+
     def test_reject_cancellation_request(self):
         """Test that an admin can reject a cancellation request
         and that the booking remains confirmed."""
@@ -315,6 +483,48 @@ class AdminActionTest(TestCase):
         self.booking.refresh_from_db()
         self.assertEqual(self.booking.status, "Confirmed")
 
+    def test_cancellation_approval_query_count(self):
+        """Test that approving writes the request and the booking once
+        each, and emails the user after commit."""
+        request = BookingCancellationRequest.objects.get(
+            pk=self.cancellation_request.pk
+        )
+        request.status = "Approved"
+        # Savepoint, request update, booking update, release.
+        with self.assertNumQueries(4):
+            with self.captureOnCommitCallbacks() as callbacks:
+                request.save()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Cancelled")
+
+        # Booking with user, queued email.
+        with self.assertNumQueries(2):
+            for callback in callbacks:
+                callback()
+        self.assertTrue(
+            OutboundEmail.objects.filter(
+                subject="Your cancellation request has been approved"
+            ).exists()
+        )
+
+    def test_cancellation_decision_emails_once(self):
+        """Test that saving an unchanged decision does nothing."""
+        request = BookingCancellationRequest.objects.get(
+            pk=self.cancellation_request.pk
+        )
+        request.status = "Rejected"
+        with self.captureOnCommitCallbacks(execute=True):
+            request.save()
+            request.save()
+        self.assertEqual(
+            OutboundEmail.objects.filter(
+                subject="Your cancellation request has been rejected"
+            ).count(),
+            1,
+        )
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Confirmed")
+
 
 #####################
 # Email confirmations
@@ -764,3 +974,971 @@ class OngoingBookingTest(TestCase):
                 for message in messages
             )
         )
+
+
+class OverlappingBookingsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="overlapuser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Overlap Campervan",
+            description="Campervan for overlap query testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+            brand="Test Brand",
+            model="Test Model",
+            availability_status=True,
+        )
+        self.start = date.today() + timedelta(days=10)
+        self.end = date.today() + timedelta(days=15)
+        self.booking = Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=self.start,
+            end_date=self.end,
+            total_price=500.00,
+            status="Confirmed",
+        )
+
+    def test_overlapping_ranges(self):
+        """Test that only ranges sharing a night are overlapping."""
+        overlapping = Booking.objects.overlapping
+        self.assertTrue(
+            overlapping(
+                self.campervan,
+                self.start - timedelta(days=2),
+                self.start + timedelta(days=1),
+            ).exists()
+        )
+        # Check-out day can be the next check-in day.
+        self.assertFalse(
+            overlapping(
+                self.campervan, self.end, self.end + timedelta(days=3)
+            ).exists()
+        )
+        self.assertFalse(
+            overlapping(
+                self.campervan, self.start - timedelta(days=3), self.start
+            ).exists()
+        )
+
+    def test_cancelled_bookings_do_not_overlap(self):
+        """Test that cancelled bookings no longer block the campervan."""
+        self.booking.status = "Cancelled"
+        self.booking.save()
+        self.assertFalse(
+            Booking.objects.overlapping(
+                self.campervan.id, self.start, self.end
+            ).exists()
+        )
+        self.assertTrue(self.campervan.is_available(self.start, self.end))
+
+    def test_fleet_wide_overlap(self):
+        """Test that campervan=None searches every campervan."""
+        self.assertEqual(
+            list(
+                Booking.objects.overlapping(
+                    None, self.start, self.end
+                ).values_list("campervan_id", flat=True)
+            ),
+            [self.campervan.id],
+        )
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        reset_booking_stats()
+        self.users = [
+            User.objects.create(username=f"racer{i}") for i in range(8)
+        ]
+        self.campervans = [
+            Campervan.objects.create(
+                name=f"Race Campervan {i}",
+                description="Campervan for concurrency testing.",
+                price_per_day=100.00,
+                image="test_image.jpg",
+                capacity=4,
+                location="Test Location",
+            )
+            for i in range(4)
+        ]
+        self.start = date.today() + timedelta(days=10)
+
+    def book_concurrently(self, jobs):
+        """Run create_booking(*job) for every job at the same moment."""
+        barrier = threading.Barrier(len(jobs))
+        results = [None] * len(jobs)
+
+        def book(index, job):
+            try:
+                barrier.wait()
+                results[index] = create_booking(*job)
+            except Exception as exc:
+                results[index] = exc
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(i, job))
+            for i, job in enumerate(jobs)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def assertNoDoubleBookings(self):
+        for booking in Booking.objects.all():
+            self.assertFalse(
+                Booking.objects.overlapping(
+                    booking.campervan_id,
+                    booking.start_date,
+                    booking.end_date,
+                )
+                .exclude(pk=booking.pk)
+                .exists()
+            )
+
+    def test_same_dates_are_booked_once(self):
+        """Test that racing checkouts for one van create one booking."""
+        end = self.start + timedelta(days=5)
+        results = self.book_concurrently(
+            [
+                (self.campervans[0], user, self.start, end)
+                for user in self.users
+            ]
+        )
+
+        created = [r for r in results if isinstance(r, Booking)]
+        self.assertEqual(len(created), 1)
+        self.assertTrue(
+            all(
+                isinstance(r, (Booking, BookingConflict)) for r in results
+            ),
+            results,
+        )
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(created[0].total_price, 500)
+        stats = booking_stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["conflicts"], 7)
+        self.assertEqual(stats["failures"], 0)
+
+    def test_separate_vans_and_dates_all_succeed(self):
+        """Test that non-overlapping bookings all go through."""
+        jobs = []
+        for i, campervan in enumerate(self.campervans):
+            for week in range(4):
+                start = self.start + timedelta(weeks=week)
+                jobs.append(
+                    (
+                        campervan,
+                        self.users[(i + week) % len(self.users)],
+                        start,
+                        start + timedelta(days=7),
+                    )
+                )
+        results = self.book_concurrently(jobs)
+
+        self.assertTrue(
+            all(isinstance(r, Booking) for r in results), results
+        )
+        self.assertEqual(Booking.objects.count(), 16)
+        self.assertNoDoubleBookings()
+        stats = booking_stats()
+        self.assertEqual(stats["created"], 16)
+        self.assertEqual(stats["conflicts"], 0)
+
+    def test_overlapping_requests_never_double_book(self):
+        """Test staggered, partly overlapping requests for one van."""
+        jobs = [
+            (
+                self.campervans[1],
+                user,
+                self.start + timedelta(days=3 * i),
+                self.start + timedelta(days=3 * i + 5),
+            )
+            for i, user in enumerate(self.users)
+        ]
+        results = self.book_concurrently(jobs)
+
+        # Every request either booked the van or was told it's taken.
+        self.assertTrue(
+            all(isinstance(r, (Booking, BookingConflict)) for r in results),
+            results,
+        )
+        self.assertNoDoubleBookings()
+        stats = booking_stats()
+        self.assertEqual(
+            stats["created"] + stats["conflicts"], len(jobs)
+        )
+        self.assertEqual(stats["created"], Booking.objects.count())
+        self.assertGreaterEqual(stats["created"], 3)
+        self.assertEqual(stats["failures"], 0)
+
+
+class ReservationExpiryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="expiryuser",
+            password="password123",
+            email="expiryuser@example.com",
+        )
+        self.campervan = Campervan.objects.create(
+            name="Expiry Campervan",
+            description="Campervan for reservation expiry testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+        )
+        self.stale_since = timezone.now() - timedelta(days=4)
+
+    def reserve(self, weeks_ahead, status="Pending", stale=True):
+        start = date.today() + timedelta(days=10, weeks=weeks_ahead)
+        booking = Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=start,
+            end_date=start + timedelta(days=5),
+            total_price=500.00,
+            status=status,
+        )
+        if stale:
+            Booking.objects.filter(pk=booking.pk).update(
+                created_at=self.stale_since
+            )
+        return booking
+
+    def test_only_stale_pending_bookings_expire(self):
+        """Test that paid and recent reservations are left alone."""
+        stale = self.reserve(0)
+        fresh = self.reserve(1, stale=False)
+        paid = self.reserve(2, status="Confirmed")
+        started = self.reserve(3, stale=False)
+        Booking.objects.filter(pk=started.pk).update(
+            start_date=date.today()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_pending_bookings(), 2)
+
+        statuses = dict(Booking.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[stale.pk], "Cancelled")
+        self.assertEqual(statuses[started.pk], "Cancelled")
+        self.assertEqual(statuses[fresh.pk], "Pending")
+        self.assertEqual(statuses[paid.pk], "Confirmed")
+        self.assertTrue(
+            is_available(self.campervan.id, stale.start_date, stale.end_date)
+        )
+
+    def test_expiry_invalidates_listings_after_commit(self):
+        """Test that cached listings are only invalidated once the
+        expiry is committed."""
+        self.reserve(0)
+        version = get_cache_version("bookings")
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_pending_bookings()
+            self.assertEqual(get_cache_version("bookings"), version)
+        self.assertNotEqual(get_cache_version("bookings"), version)
+
+    def test_expiry_runs_in_batches(self):
+        """Test that each batch is one UPDATE plus one email INSERT."""
+        for week in range(5):
+            self.reserve(week)
+        OutboundEmail.objects.all().delete()
+
+        # 3 batches of at most 2, each: savepoint, SELECT ... FOR UPDATE,
+        # UPDATE, INSERT and release. The short last batch ends the sweep.
+        with self.assertNumQueries(15):
+            self.assertEqual(expire_pending_bookings(batch_size=2), 5)
+
+        self.assertFalse(Booking.objects.filter(status="Pending").exists())
+        emails = OutboundEmail.objects.all()
+        self.assertEqual(len(emails), 5)
+        self.assertEqual(
+            {email.subject for email in emails}, {"Reservation Expired"}
+        )
+        self.assertEqual(emails[0].recipients, ["expiryuser@example.com"])
+
+    def test_expire_pending_bookings_command(self):
+        """Test that the command reports what it expired."""
+        self.reserve(0)
+        out = StringIO()
+        call_command("expire_pending_bookings", stdout=out)
+        self.assertIn("Expired 1 pending booking(s).", out.getvalue())
+
+
+class AsyncPollingViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="asyncuser", password="password123"
+        )
+        self.other = User.objects.create_user(
+            username="otheruser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Async Campervan",
+            description="Campervan for async view testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+        )
+        self.start = date.today() + timedelta(days=10)
+        self.booking = Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=self.start,
+            end_date=self.start + timedelta(days=5),
+            total_price=500.00,
+            status="Confirmed",
+        )
+        self.status_url = reverse(
+            "check_booking_status", args=[self.booking.id]
+        )
+
+    async def test_booking_status_over_asgi(self):
+        """Test that the async status view only answers the owner."""
+        response = await self.async_client.get(self.status_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response.url)
+
+        await sync_to_async(self.async_client.force_login)(self.other)
+        response = await self.async_client.get(self.status_url)
+        self.assertEqual(response.status_code, 404)
+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.status_url)
+        self.assertEqual(response.json(), {"status": "Confirmed"})
+
+    async def test_check_availability_over_asgi(self):
+        """Test both availability endpoints through the ASGI handler."""
+        for url in ("/booking/check-availability/", "/check-availability/"):
+            response = await self.async_client.get(
+                url,
+                {
+                    "campervan_id": self.campervan.id,
+                    "start_date": (self.start + timedelta(days=2)).isoformat(),
+                    "end_date": (self.start + timedelta(days=8)).isoformat(),
+                },
+            )
+            self.assertEqual(response.json(), {"is_available": False})
+
+    async def test_availability_beyond_bitmap_uses_database(self):
+        """Test that ranges outside the bitmap are checked in SQL."""
+        start = date.today() + timedelta(days=HORIZON_DAYS + 5)
+        self.assertTrue(
+            await ais_available(
+                self.campervan.id, start, start + timedelta(days=3)
+            )
+        )
+        with self.assertRaises(Campervan.DoesNotExist):
+            await ais_available(0, self.start, self.start)
+
+
+@override_settings(BOOKING_STATUS_STREAM=True)
+class BookingStatusStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="streamuser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Stream Campervan",
+            description="Campervan for status stream testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+        )
+        start = date.today() + timedelta(days=10)
+        self.booking = Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=start,
+            end_date=start + timedelta(days=5),
+            total_price=500.00,
+            status="Pending",
+        )
+        self.stream_url = reverse(
+            "booking_status_stream", args=[self.booking.id]
+        )
+
+    async def read_events(self, response):
+        """Collect the stream's chunks, failing if it never ends."""
+        chunks = []
+
+        async def read():
+            async for chunk in response.streaming_content:
+                chunks.append(chunk.decode())
+                if len(chunks) == 1:
+                    # Payment webhook processed in this process
+                    publish_status(self.booking.id, "Confirmed")
+
+        await asyncio.wait_for(read(), timeout=5)
+        return chunks
+
+    def test_saving_a_booking_publishes_its_status(self):
+        """Test that status changes are published once committed."""
+        self.booking.status = "Confirmed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.save()
+        self.assertEqual(
+            cache.get(status_cache_key(self.booking.id)), "Confirmed"
+        )
+
+    async def test_stream_pushes_the_confirmation(self):
+        """Test that one stream delivers the status change and ends."""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        chunks = await self.read_events(response)
+        self.assertEqual(len(chunks), 2)
+        self.assertIn('data: {"status": "Pending"}', chunks[0])
+        self.assertEqual(
+            chunks[1], 'event: status\ndata: {"status": "Confirmed"}\n\n'
+        )
+
+    async def test_stream_ends_for_settled_bookings(self):
+        """Test that a confirmed booking gets one event and no wait."""
+        await Booking.objects.filter(pk=self.booking.pk).aupdate(
+            status="Confirmed"
+        )
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.stream_url)
+        chunks = [
+            chunk.decode() async for chunk in response.streaming_content
+        ]
+        self.assertEqual(len(chunks), 1)
+        self.assertIn('"Confirmed"', chunks[0])
+
+    async def test_stream_is_private(self):
+        """Test that other users can't watch the booking."""
+        other = await sync_to_async(User.objects.create_user)(
+            username="otherstreamuser", password="password123"
+        )
+        await sync_to_async(self.async_client.force_login)(other)
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_payment_success_page_subscribes_to_the_stream(self):
+        """Test that the success page opens the booking's stream."""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(
+            reverse("payment_success"),
+            {"booking_id": self.booking.id, "session_id": "cs_test"},
+        )
+        self.assertContains(response, self.stream_url)
+
+    def test_no_stream_under_wsgi(self):
+        """Test that WSGI requests poll the status endpoint instead."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.stream_url)
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(
+            reverse("payment_success"),
+            {"booking_id": self.booking.id, "session_id": "cs_test"},
+        )
+        self.assertNotContains(response, self.stream_url)
+        self.assertContains(
+            response,
+            reverse("check_booking_status", args=[self.booking.id]),
+        )
+
+    @override_settings(BOOKING_STATUS_STREAM=False)
+    async def test_no_stream_without_shared_cache(self):
+        """Test that the stream is off unless status changes can reach
+        every process."""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(OCCUPANCY_BITMAP=True)
+class OccupancyCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="occupancyuser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Occupancy Campervan",
+            description="Campervan for occupancy bitmap testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+            brand="Test Brand",
+            model="Test Model",
+        )
+        self.start = date.today() + timedelta(days=10)
+        self.end = date.today() + timedelta(days=15)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking = Booking.objects.create(
+                user=self.user,
+                campervan=self.campervan,
+                start_date=self.start,
+                end_date=self.end,
+                total_price=500.00,
+                status="Confirmed",
+            )
+
+    def assertAvailable(self, start, end, expected):
+        self.assertEqual(
+            is_available(self.campervan.id, start, end), expected
+        )
+
+    def test_availability_from_bitmap(self):
+        """Test that checks after the first need no queries."""
+        get_occupancy(self.campervan.id)
+        with self.assertNumQueries(0):
+            self.assertAvailable(self.start, self.end, False)
+            self.assertAvailable(
+                self.start - timedelta(days=2),
+                self.start + timedelta(days=1),
+                False,
+            )
+            # Check-out day can be the next check-in day.
+            self.assertAvailable(self.end, self.end + timedelta(days=3), True)
+            self.assertAvailable(
+                self.start - timedelta(days=3), self.start, True
+            )
+            response = self.client.get(
+                reverse("check_availability"),
+                {
+                    "campervan_id": self.campervan.id,
+                    "start_date": self.start.strftime("%Y-%m-%d"),
+                    "end_date": self.end.strftime("%Y-%m-%d"),
+                },
+            )
+        self.assertEqual(response.json(), {"is_available": False})
+
+    def test_bitmap_follows_booking_changes(self):
+        """Test that saves and deletes update the cached bitmap."""
+        get_occupancy(self.campervan.id)
+        moved_start = self.end + timedelta(days=5)
+        moved_end = moved_start + timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.start_date = moved_start
+            self.booking.end_date = moved_end
+            self.booking.save()
+        self.assertAvailable(self.start, self.end, True)
+        self.assertAvailable(moved_start, moved_end, False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.status = "Cancelled"
+            self.booking.save()
+        self.assertAvailable(moved_start, moved_end, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.status = "Confirmed"
+            self.booking.save()
+            self.booking.delete()
+        self.assertAvailable(moved_start, moved_end, True)
+
+    def test_approved_cancellation_frees_bitmap(self):
+        """Test that approving a cancellation frees the dates."""
+        get_occupancy(self.campervan.id)
+        request = self.booking.cancellation_requests.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            request.status = "Approved"
+            request.save()
+        self.assertAvailable(self.start, self.end, True)
+
+    def test_bitmap_built_before_commit_is_not_used(self):
+        """Test that a bitmap read before a booking committed is
+        dropped once it commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.user,
+                campervan=self.campervan,
+                start_date=self.end,
+                end_date=self.end + timedelta(days=3),
+                total_price=300.00,
+            )
+            # A concurrent reader that can't see the new booking yet
+            with patch(
+                "booking.availability._booked_periods", return_value=[]
+            ):
+                get_occupancy(self.campervan.id)
+        self.assertAvailable(self.end, self.end + timedelta(days=3), False)
+
+    @override_settings(OCCUPANCY_BITMAP=False)
+    def test_bitmap_disabled_uses_database(self):
+        """Test that availability is checked in SQL without the bitmap."""
+        with self.assertNumQueries(1):
+            self.assertAvailable(self.start, self.end, False)
+        self.assertIsNone(cache.get(occupancy_cache_key(self.campervan.id)))
+        with self.assertRaises(Campervan.DoesNotExist):
+            is_available(self.campervan.id + 1, self.start, self.end)
+
+    def test_beyond_horizon_and_unknown_campervan(self):
+        """Test that far-future ranges fall back to the database and
+        unknown campervans are rejected."""
+        far = date.today() + timedelta(days=HORIZON_DAYS + 10)
+        Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=far,
+            end_date=far + timedelta(days=2),
+            total_price=200.00,
+        )
+        self.assertAvailable(far, far + timedelta(days=1), False)
+        with self.assertRaises(Campervan.DoesNotExist):
+            is_available(self.campervan.id + 1, self.start, self.end)
+
+
+class FleetAvailabilityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="fleetuser", password="password123"
+        )
+        self.campervans = [
+            Campervan.objects.create(
+                name=f"Fleet Campervan {i}",
+                description="Campervan for fleet availability testing.",
+                price_per_day=100.00,
+                image="test_image.jpg",
+                capacity=4,
+                location="Test Location",
+            )
+            for i in range(3)
+        ]
+        self.start = date.today() + timedelta(days=10)
+        self.end = date.today() + timedelta(days=15)
+        Booking.objects.create(
+            user=self.user,
+            campervan=self.campervans[0],
+            start_date=self.start,
+            end_date=self.end,
+            total_price=500.00,
+        )
+        self.url = reverse("check_fleet_availability")
+
+    def range_param(self, start, end):
+        return f"{start:%Y-%m-%d}:{end:%Y-%m-%d}"
+
+    def test_fleet_availability_for_several_ranges(self):
+        """Test that every campervan and range is answered in one query."""
+        later = self.end + timedelta(days=1)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url,
+                {
+                    "range": [
+                        self.range_param(self.start, self.end),
+                        self.range_param(later, later + timedelta(days=2)),
+                    ]
+                },
+            )
+        self.assertEqual(
+            response.json()["campervans"],
+            [
+                {"id": self.campervans[0].id, "available": [False, True]},
+                {"id": self.campervans[1].id, "available": [True, True]},
+                {"id": self.campervans[2].id, "available": [True, True]},
+            ],
+        )
+
+    @override_settings(SHARED_CACHE=True)
+    def test_fleet_availability_for_subset(self):
+        """Test filtering by campervan_ids with start and end dates."""
+        ids = f"{self.campervans[0].id},{self.campervans[2].id}"
+        params = {
+            "campervan_ids": ids,
+            "start_date": self.start.strftime("%Y-%m-%d"),
+            "end_date": self.end.strftime("%Y-%m-%d"),
+        }
+        response = self.client.get(self.url, params)
+        self.assertEqual(
+            [c["id"] for c in response.json()["campervans"]],
+            [self.campervans[0].id, self.campervans[2].id],
+        )
+        # Cached until a booking or campervan changes.
+        with self.assertNumQueries(0):
+            self.client.get(self.url, params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.user,
+                campervan=self.campervans[2],
+                start_date=self.start,
+                end_date=self.end,
+                total_price=500.00,
+            )
+        response = self.client.get(self.url, params)
+        self.assertEqual(
+            [c["available"] for c in response.json()["campervans"]],
+            [[False], [False]],
+        )
+
+    def test_fleet_availability_not_cached_per_process(self):
+        """Test that without a shared cache, bookings made by another
+        process (no version bump here) show up straight away."""
+        params = {
+            "start_date": self.start.strftime("%Y-%m-%d"),
+            "end_date": self.end.strftime("%Y-%m-%d"),
+        }
+        self.client.get(self.url, params)
+        # Not committed here, so this process never bumps the version.
+        Booking.objects.create(
+            user=self.user,
+            campervan=self.campervans[1],
+            start_date=self.start,
+            end_date=self.end,
+            total_price=500.00,
+        )
+        response = self.client.get(self.url, params)
+        self.assertEqual(
+            [c["available"] for c in response.json()["campervans"]],
+            [[False], [False], [True]],
+        )
+
+    def test_fleet_availability_invalid_input(self):
+        """Test that missing or reversed ranges are rejected."""
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        response = self.client.get(
+            self.url, {"range": self.range_param(self.end, self.start)}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            self.url,
+            {"range": ["2030-01-01:2030-01-02"] * 11},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AvailabilityCalendarTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="calendaruser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Calendar Campervan",
+            description="Campervan for calendar testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+        )
+        self.booking = Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=date(2030, 4, 28),
+            end_date=date(2030, 5, 3),
+            total_price=500.00,
+            status="Confirmed",
+        )
+        Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=date(2030, 5, 10),
+            end_date=date(2030, 5, 12),
+            total_price=200.00,
+            status="Cancelled",
+        )
+        self.url = reverse(
+            "availability_calendar", args=[self.campervan.id, "2030-05"]
+        )
+
+    def test_calendar_days(self):
+        """Test that booked nights are listed and the rest are free."""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(data["booked"], ["2030-05-01", "2030-05-02"])
+        self.assertEqual(len(data["free"]), 29)
+        self.assertIn("2030-05-03", data["free"])
+        self.assertIn("2030-05-10", data["free"])
+        self.assertEqual(
+            response["Last-Modified"],
+            http_date(self.booking.updated_at.timestamp()),
+        )
+
+    def test_calendar_conditional_requests(self):
+        """Test that unchanged months answer 304 until a booking moves."""
+        etag = self.client.get(self.url)["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.booking.end_date = date(2030, 5, 5)
+        self.booking.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("2030-05-04", response.json()["booked"])
+
+    def test_calendar_unknown_campervan(self):
+        """Test that unknown campervans and invalid months are 404s."""
+        url = reverse(
+            "availability_calendar", args=[self.campervan.id + 1, "2030-05"]
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse(
+            "availability_calendar", args=[self.campervan.id, "2030-13"]
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse(
+            "availability_calendar", args=[self.campervan.id, "9999-12"]
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class EmailOutboxTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="mailuser",
+            password="password123",
+            email="mailuser@example.com",
+        )
+        self.client.login(username="mailuser", password="password123")
+        self.campervan = Campervan.objects.create(
+            name="Mail Campervan",
+            description="Campervan for email queue testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+            brand="Test Brand",
+            model="Test Model",
+            availability_status=True,
+        )
+
+    def book(self):
+        start = date.today() + timedelta(days=10)
+        return self.client.post(
+            reverse("book_campervan", args=[self.campervan.id]),
+            {
+                "start_date": start.strftime("%Y-%m-%d"),
+                "end_date": (start + timedelta(days=3)).strftime("%Y-%m-%d"),
+            },
+        )
+
+    def test_booking_only_queues_email(self):
+        """Test that creating a booking queues the email without sending."""
+        self.book()
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.subject, "Reservation Received")
+        self.assertEqual(queued.recipients, ["mailuser@example.com"])
+        self.assertEqual(queued.status, "Pending")
+
+    def test_worker_sends_batch_over_one_connection(self):
+        """Test that the worker drains the outbox in one batch."""
+        self.book()
+        OutboundEmail.objects.create(
+            subject="Extra",
+            body="Body",
+            from_email="no-reply@wildventures.com",
+            recipients=["someone@example.com"],
+        )
+        with patch("booking.mail.get_connection") as get_connection:
+            get_connection.return_value = mail.get_connection()
+            self.assertEqual(deliver_queued_emails(batch_size=10), 2)
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboundEmail.objects.filter(status="Pending"))
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Test that failures are rescheduled and eventually given up."""
+        queued = OutboundEmail.objects.create(
+            subject="Retry",
+            body="Body",
+            from_email="no-reply@wildventures.com",
+            recipients=["someone@example.com"],
+        )
+        with patch(
+            "booking.mail.EmailMessage.send", side_effect=OSError("down")
+        ):
+            deliver_queued_emails()
+            queued.refresh_from_db()
+            self.assertEqual(queued.status, "Pending")
+            self.assertEqual(queued.attempts, 1)
+            self.assertGreater(queued.next_attempt_at, timezone.now())
+
+            # Not due yet, so nothing is picked up.
+            self.assertEqual(deliver_queued_emails(), 0)
+
+            for _ in range(MAX_ATTEMPTS - 1):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                deliver_queued_emails()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "Failed")
+        self.assertEqual(queued.last_error, "down")
+
+    def test_send_queued_emails_command(self):
+        """Test that the management command drains the outbox."""
+        self.book()
+        call_command("send_queued_emails", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutboundEmail.objects.get().status, "Sent")
+
+
+@override_settings(
+    EMAIL_BACKEND="booking.backends.PooledEmailBackend",
+    EMAIL_HOST_USER="",
+    EMAIL_HOST_PASSWORD="",
+)
+class PooledEmailBackendTest(TestCase):
+    def setUp(self):
+        close_pooled_connection()
+        reset_connection_stats()
+        patcher = patch("django.core.mail.backends.smtp.smtplib.SMTP")
+        self.smtp = patcher.start()
+        self.smtp.return_value.noop.return_value = (250, b"OK")
+        self.addCleanup(patcher.stop)
+        self.addCleanup(close_pooled_connection)
+
+    def test_connection_is_reused_across_send_mail_calls(self):
+        """Test that separate send_mail() calls share one SMTP session."""
+        for i in range(3):
+            mail.send_mail(
+                f"Subject {i}",
+                "Body",
+                "no-reply@wildventures.com",
+                ["someone@example.com"],
+            )
+        self.smtp.assert_called_once()
+        self.assertEqual(self.smtp.return_value.sendmail.call_count, 3)
+        stats = connection_stats()
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["messages_sent"], 3)
+        self.assertEqual(stats["messages_per_connection"], 3.0)
+
+    def test_outbox_batches_share_pooled_connection(self):
+        """Test that consecutive worker batches reuse the connection."""
+        for i in range(4):
+            OutboundEmail.objects.create(
+                subject=f"Queued {i}",
+                body="Body",
+                from_email="no-reply@wildventures.com",
+                recipients=["someone@example.com"],
+            )
+        deliver_queued_emails(batch_size=2)
+        deliver_queued_emails(batch_size=2)
+        self.smtp.assert_called_once()
+        self.assertEqual(connection_stats()["messages_sent"], 4)
+
+    def test_broken_connection_is_replaced(self):
+        """Test that a dropped session is discarded and reopened."""
+        send = self.smtp.return_value.sendmail
+        send.side_effect = [OSError("reset"), {}]
+        with self.assertRaises(OSError):
+            mail.send_mail(
+                "First", "Body", "no-reply@wildventures.com", ["a@b.com"]
+            )
+        mail.send_mail(
+            "Second", "Body", "no-reply@wildventures.com", ["a@b.com"]
+        )
+        self.assertEqual(self.smtp.call_count, 2)
+        self.assertEqual(connection_stats()["connections_opened"], 2)
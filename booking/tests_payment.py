@@ -1,14 +1,20 @@
 import json
 from datetime import date, timedelta
+from django.conf import settings
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
-from unittest.mock import patch
+from django.utils import timezone
+from unittest.mock import Mock, patch
 from booking.models import (
     Booking,
     BookingChangeRequest,
     BookingCancellationRequest,
+    OutboundEmail,
+    StripeEvent,
 )
+from booking.expiry import hold_deadline
+from booking.webhooks import process_pending_events
 from core.models import Campervan
 import stripe
 
@@ -92,8 +98,7 @@ class StripePaymentTest(TestCase):
             response, reverse("booking_details", args=[self.booking.id])
         )
 
-    @patch("booking.views.send_mail")
-    def test_stripe_webhook_updates_booking_status(self, mock_send_mail):
+    def test_stripe_webhook_updates_booking_status(self):
         """
         Verify that the booking status is updated to 'Confirmed'
         when a checkout.session.completed event is received.
@@ -129,9 +134,19 @@ class StripePaymentTest(TestCase):
             )
             self.assertEqual(response.status_code, 200)
 
+        # The webhook only records the event, the worker applies it
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Pending")
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_events()
+
         # Reload the booking from the database and check the status
         self.booking.refresh_from_db()
         self.assertEqual(self.booking.status, "Confirmed")
+        # The confirmation email is queued instead of sent inline
+        self.assertTrue(
+            OutboundEmail.objects.filter(subject="Booking Confirmed").exists()
+        )
 
     @patch("booking.views.stripe.Webhook.construct_event")
     def test_stripe_webhook_invalid_payload(self, mock_construct):
@@ -229,3 +244,294 @@ class StripePaymentTest(TestCase):
                 for message in messages
             )
         )
+
+    def post_event(self, event_payload):
+        with patch(
+            "booking.views.stripe.Webhook.construct_event"
+        ) as mock_construct:
+            mock_construct.return_value = event_payload
+            return self.client.post(
+                reverse("stripe_webhook"),
+                data=json.dumps(event_payload),
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="test_sig",
+            )
+
+    def test_stripe_webhook_records_retries_once(self):
+        """
+        Ensure that Stripe retries of the same event are acknowledged
+        but only recorded and processed once.
+        """
+        event_payload = {
+            "id": "evt_retry",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "data": {
+                "object": {
+                    "id": "cs_test_dummy",
+                    "metadata": {"booking_id": str(self.booking.id)},
+                }
+            },
+        }
+        for _ in range(3):
+            response = self.post_event(event_payload)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_events(), 1)
+        self.assertEqual(process_pending_events(), 0)
+        self.assertEqual(StripeEvent.objects.get().status, "Processed")
+        self.assertEqual(
+            OutboundEmail.objects.filter(subject="Booking Confirmed").count(),
+            1,
+        )
+
+    def test_failed_event_is_retried_with_backoff(self):
+        """
+        Ensure that an event whose processing failed isn't picked up
+        again until its retry delay has passed.
+        """
+        self.post_event(
+            {
+                "id": "evt_backoff",
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {
+                    "object": {
+                        "id": "cs_test_dummy",
+                        "metadata": {"booking_id": str(self.booking.id)},
+                    }
+                },
+            }
+        )
+        failing = Mock(side_effect=RuntimeError("database hiccup"))
+        with patch.dict(
+            "booking.webhooks.EVENT_HANDLERS",
+            {"checkout.session.completed": failing},
+        ):
+            self.assertEqual(process_pending_events(), 1)
+        stripe_event = StripeEvent.objects.get()
+        self.assertEqual(stripe_event.status, "Pending")
+        self.assertEqual(stripe_event.attempts, 1)
+        self.assertGreater(stripe_event.next_attempt_at, timezone.now())
+        self.assertEqual(process_pending_events(), 0)
+
+        StripeEvent.objects.update(next_attempt_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_events(), 1)
+        self.assertEqual(StripeEvent.objects.get().status, "Processed")
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Confirmed")
+
+    def test_stripe_webhook_processing_is_idempotent(self):
+        """
+        Ensure that a second completed event for an already
+        confirmed booking doesn't send another confirmation.
+        """
+        for event_id in ("evt_first", "evt_second"):
+            self.post_event(
+                {
+                    "id": event_id,
+                    "object": "event",
+                    "type": "checkout.session.completed",
+                    "data": {
+                        "object": {
+                            "id": "cs_test_dummy",
+                            "client_reference_id": str(self.booking.id),
+                        }
+                    },
+                }
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_events(), 2)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Confirmed")
+        self.assertEqual(
+            OutboundEmail.objects.filter(subject="Booking Confirmed").count(),
+            1,
+        )
+
+    def test_stripe_webhook_expired_session_releases_booking(self):
+        """
+        Ensure that an expired checkout session cancels the unpaid
+        booking once, and never touches a paid one.
+        """
+        for event_id in ("evt_expired", "evt_expired_again"):
+            self.post_event(
+                {
+                    "id": event_id,
+                    "object": "event",
+                    "type": "checkout.session.expired",
+                    "data": {
+                        "object": {
+                            "id": "cs_test_dummy",
+                            "metadata": {
+                                "booking_id": str(self.booking.id)
+                            },
+                        }
+                    },
+                }
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_events(), 2)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Cancelled")
+        self.assertEqual(
+            OutboundEmail.objects.filter(
+                subject="Reservation Expired"
+            ).count(),
+            1,
+        )
+        self.assertTrue(
+            self.campervan.is_available(
+                self.booking.start_date, self.booking.end_date
+            )
+        )
+
+    @patch("booking.views.stripe.checkout.Session.create")
+    def test_superseded_checkout_session_expiry_is_ignored(
+        self, mock_stripe_session_create
+    ):
+        """
+        Ensure that an abandoned session expiring doesn't cancel a
+        booking the customer is paying through a newer session.
+        """
+        url = reverse("create_checkout_session", args=[self.booking.id])
+        for session_id in ("cs_test_old", "cs_test_new"):
+            mock_stripe_session_create.return_value = type(
+                "obj",
+                (object,),
+                {"url": "http://stripe.test/checkout", "id": session_id},
+            )
+            self.client.get(url)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.checkout_session_id, "cs_test_new")
+
+        for event_id, event_type, session_id in (
+            ("evt_old_expired", "checkout.session.expired", "cs_test_old"),
+            ("evt_new_paid", "checkout.session.completed", "cs_test_new"),
+        ):
+            self.post_event(
+                {
+                    "id": event_id,
+                    "object": "event",
+                    "type": event_type,
+                    "data": {
+                        "object": {
+                            "id": session_id,
+                            "metadata": {
+                                "booking_id": str(self.booking.id)
+                            },
+                        }
+                    },
+                }
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_events(), 2)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Confirmed")
+        self.assertFalse(
+            OutboundEmail.objects.filter(
+                subject="Reservation Expired"
+            ).exists()
+        )
+
+    @patch("booking.views.stripe.checkout.Session.create")
+    def test_checkout_session_expires_before_the_hold(
+        self, mock_stripe_session_create
+    ):
+        """
+        Ensure that the Stripe session can't outlive the reservation
+        hold, and that no session is opened when the hold is nearly up.
+        """
+        mock_stripe_session_create.return_value = type(
+            "obj",
+            (object,),
+            {"url": "http://stripe.test/checkout", "id": "cs_test_dummy"},
+        )
+        url = reverse("create_checkout_session", args=[self.booking.id])
+        self.client.get(url)
+        _, kwargs = mock_stripe_session_create.call_args
+        self.assertLessEqual(
+            kwargs["expires_at"], hold_deadline(self.booking).timestamp()
+        )
+        self.assertGreaterEqual(
+            kwargs["expires_at"],
+            (timezone.now() + timedelta(minutes=30)).timestamp(),
+        )
+
+        mock_stripe_session_create.reset_mock()
+        Booking.objects.filter(pk=self.booking.pk).update(
+            created_at=timezone.now()
+            - timedelta(days=settings.BOOKING_HOLD_DAYS, minutes=-10)
+        )
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, reverse("booking_details", args=[self.booking.id])
+        )
+        mock_stripe_session_create.assert_not_called()
+
+    def post_completed(self, event_id):
+        self.post_event(
+            {
+                "id": event_id,
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {
+                    "object": {
+                        "id": "cs_test_late",
+                        "payment_intent": "pi_test_late",
+                        "metadata": {"booking_id": str(self.booking.id)},
+                    }
+                },
+            }
+        )
+
+    @patch("booking.webhooks.stripe.Refund.create")
+    def test_payment_after_cancellation_reconfirms_free_booking(
+        self, mock_refund
+    ):
+        """
+        Ensure that a late payment for an expired booking confirms it
+        again when its dates are still free.
+        """
+        self.booking.status = "Cancelled"
+        self.booking.save()
+        self.post_completed("evt_late_free")
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_events()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Confirmed")
+        mock_refund.assert_not_called()
+        self.assertTrue(
+            OutboundEmail.objects.filter(subject="Booking Confirmed").exists()
+        )
+
+    @patch("booking.webhooks.stripe.Refund.create")
+    def test_payment_after_cancellation_refunds_taken_dates(
+        self, mock_refund
+    ):
+        """
+        Ensure that a late payment is refunded when someone else has
+        booked the dates meanwhile.
+        """
+        self.booking.status = "Cancelled"
+        self.booking.save()
+        Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=self.booking.start_date,
+            end_date=self.booking.end_date,
+            total_price=500.00,
+            status="Confirmed",
+        )
+        self.post_completed("evt_late_taken")
+        process_pending_events()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Cancelled")
+        mock_refund.assert_called_once_with(
+            payment_intent="pi_test_late",
+            idempotency_key="refund-cs_test_late",
+        )
+        self.assertEqual(StripeEvent.objects.get().status, "Processed")
@@ -1,9 +1,12 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import (
     book_campervan,
     check_availability,
+    check_fleet_availability,
+    availability_calendar,
     cancel_booking,
     check_booking_status,
+    booking_status_stream,
     booking_confirmation,
     booking_details,
     edit_booking,
@@ -21,12 +24,27 @@ from .views import (
 urlpatterns = [
     path("book/<int:campervan_id>/", book_campervan, name="book_campervan"),
     path("check-availability/", check_availability, name="check_availability"),
+    path(
+        "fleet-availability/",
+        check_fleet_availability,
+        name="check_fleet_availability",
+    ),
+    re_path(
+        r"^calendar/(?P<campervan_id>[0-9]+)/(?P<month>[0-9]{4}-[0-9]{2})/$",
+        availability_calendar,
+        name="availability_calendar",
+    ),
     path("cancel/<int:booking_id>/", cancel_booking, name="cancel_booking"),
     path(
         "status/<int:booking_id>/",
         check_booking_status,
         name="check_booking_status",
     ),
+    path(
+        "status/<int:booking_id>/stream/",
+        booking_status_stream,
+        name="booking_status_stream",
+    ),
     path(
         "booking-confirmation/<int:booking_id>/",
         booking_confirmation,
@@ -1,21 +1,41 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
-from django.core.mail import send_mail
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.contrib.auth import get_user
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.core.paginator import Paginator
 from datetime import datetime, date, timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
 import stripe
+from asgiref.sync import sync_to_async
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.urls import reverse
+from django.utils import timezone
+import asyncio
+import hashlib
+import json
 import logging
 
+from core.caching import listing_cache_key
+from .availability import fleet_availability, month_calendar
+from .availability import ais_available
+from .events import next_status
+from .expiry import hold_deadline
+from .mail import queue_email, queue_mass_email
+from .services import BookingConflict, create_booking
 from .models import (
     Campervan,
     Booking,
     BookingChangeRequest,
     BookingCancellationRequest,
+    StripeEvent,
 )
 
 logger = logging.getLogger(__name__)
@@ -108,13 +128,14 @@ def book_campervan(request, campervan_id):
                 },
             )
 
-        # Check for overlapping bookings
-        overlapping = Booking.objects.filter(
-            campervan=campervan,
-            start_date__lt=end_date_dt,
-            end_date__gt=start_date_dt,
-        ).exclude(status="Cancelled")
-        if overlapping.exists():
+        # Creates booking with status Pending (i.e. an unpaid reservation).
+        # The overlap check runs under a lock on the campervan, so two
+        # concurrent checkouts can't both book the same dates.
+        try:
+            booking = create_booking(
+                campervan, request.user, start_date_dt, end_date_dt
+            )
+        except BookingConflict:
             return render(
                 request,
                 "booking/book_campervan.html",
@@ -126,19 +147,6 @@ def book_campervan(request, campervan_id):
                 },
             )
 
-        # Creates booking with status Pending (i.e. an unpaid reservation)
-        days = (end_date_dt - start_date_dt).days
-        total_price = days * campervan.price_per_day
-
-        booking = Booking.objects.create(
-            campervan=campervan,
-            user=request.user,
-            start_date=start_date_dt,
-            end_date=end_date_dt,
-            total_price=total_price,
-            status="Pending",
-        )
-
         # Send reservation notification email prompting payment within 3 days
         send_reservation_confirmation_email(booking)
         return redirect("booking_confirmation", booking_id=booking.id)
@@ -186,9 +194,10 @@ def booking_details(request, booking_id):
     )
 
 
-def check_availability(request):
+async def check_availability(request):
     """
     Responsible for availability checks.
+    Async so the datepicker polling doesn't hold a worker under ASGI.
     """
     campervan_id = request.GET.get("campervan_id")
     start_date = request.GET.get("start_date")
@@ -198,7 +207,7 @@ def check_availability(request):
         return JsonResponse({"error": "Invalid input"}, status=400)
 
     try:
-        campervan = Campervan.objects.get(id=campervan_id)
+        campervan_id = int(campervan_id)
         start_date_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
 
@@ -208,25 +217,225 @@ def check_availability(request):
                 {"error": "End date must be after start date."}, status=400
             )
 
-        overlapping = Booking.objects.filter(
-            campervan=campervan,
-            start_date__lt=end_date_dt,
-            end_date__gt=start_date_dt,
-        ).exclude(status="Cancelled")
-        is_available = not overlapping.exists()
+        # Answered from the cached occupancy bitmap
+        is_available = await ais_available(
+            campervan_id, start_date_dt, end_date_dt
+        )
         return JsonResponse({"is_available": is_available})
 
     except (Campervan.DoesNotExist, ValueError) as e:
         return JsonResponse({"error": str(e)}, status=400)
 
 
-@login_required
-def check_booking_status(request, booking_id):
+# Most date ranges accepted by one fleet availability request
+MAX_AVAILABILITY_RANGES = 10
+
+
+def check_fleet_availability(request):
+    """
+    Availability of the whole fleet, or of ?campervan_ids=1,2,3, for
+    ?start_date=&end_date= and/or one or more ?range=YYYY-MM-DD:YYYY-MM-DD.
+    """
+    raw_ranges = request.GET.getlist("range")
+    if request.GET.get("start_date") or request.GET.get("end_date"):
+        raw_ranges.insert(
+            0,
+            f"{request.GET.get('start_date', '')}:"
+            f"{request.GET.get('end_date', '')}",
+        )
+    if not raw_ranges:
+        return JsonResponse({"error": "Invalid input"}, status=400)
+    if len(raw_ranges) > MAX_AVAILABILITY_RANGES:
+        return JsonResponse(
+            {
+                "error": f"At most {MAX_AVAILABILITY_RANGES} ranges "
+                f"per request."
+            },
+            status=400,
+        )
+
+    try:
+        ranges = []
+        for raw in raw_ranges:
+            start, end = raw.split(":")
+            start_date_dt = datetime.strptime(start, "%Y-%m-%d").date()
+            end_date_dt = datetime.strptime(end, "%Y-%m-%d").date()
+            if end_date_dt <= start_date_dt:
+                return JsonResponse(
+                    {"error": "End date must be after start date."},
+                    status=400,
+                )
+            ranges.append((start_date_dt, end_date_dt))
+
+        campervan_ids = request.GET.get("campervan_ids")
+        if campervan_ids:
+            campervan_ids = [int(pk) for pk in campervan_ids.split(",")]
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Bookings also change in the webhook and expiry workers, so the
+    # answer is only cached when every process shares the cache.
+    cache_key = listing_cache_key(
+        "fleet_availability", request, ["campervans", "bookings"]
+    )
+    data = cache.get(cache_key) if settings.SHARED_CACHE else None
+    if data is None:
+        availability = fleet_availability(ranges, campervan_ids or None)
+        data = {
+            "ranges": [
+                {"start_date": start.isoformat(), "end_date": end.isoformat()}
+                for start, end in ranges
+            ],
+            "campervans": [
+                {"id": pk, "available": available}
+                for pk, available in availability.items()
+            ],
+        }
+        if settings.SHARED_CACHE:
+            cache.set(cache_key, data, settings.CACHE_TIMEOUT)
+    return JsonResponse(data)
+
+
+def _month_calendar(request, campervan_id, month):
+    """
+    Calendar for the request, computed once and shared by the
+    ETag / Last-Modified checks and the view.
+    """
+    if not hasattr(request, "_month_calendar"):
+        try:
+            month_start = datetime.strptime(month, "%Y-%m").date()
+            request._month_calendar = month_calendar(
+                campervan_id, month_start
+            )
+        except (OverflowError, ValueError):
+            # Not a month, or 9999-12 (whose next month can't be a date)
+            request._month_calendar = None
+    return request._month_calendar
+
+
+def _calendar_etag(request, campervan_id, month):
+    calendar = _month_calendar(request, campervan_id, month)
+    if calendar is None:
+        return None
+    content = f"{campervan_id}:{month}:{','.join(calendar['booked'])}"
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def _calendar_last_modified(request, campervan_id, month):
+    calendar = _month_calendar(request, campervan_id, month)
+    return calendar and calendar["last_modified"]
+
+
+@cache_control(public=True, max_age=60)
+@condition(
+    etag_func=_calendar_etag, last_modified_func=_calendar_last_modified
+)
+def availability_calendar(request, campervan_id, month):
+    """
+    Booked and free days of one month (yyyy-mm) for a campervan,
+    so the booking form can grey out unavailable days.
+    """
+    calendar = _month_calendar(request, campervan_id, month)
+    if calendar is None:
+        return JsonResponse(
+            {"error": "Unknown campervan or invalid month."}, status=404
+        )
+    return JsonResponse(
+        {
+            "campervan_id": int(campervan_id),
+            "month": month,
+            "booked": calendar["booked"],
+            "free": calendar["free"],
+        }
+    )
+
+
+async def check_booking_status(request, booking_id):
     """
     Function to check the booking status (Pending, Confirmed, Cancelled).
+    Async so status polling doesn't hold a worker under ASGI.
     """
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
-    return JsonResponse({"status": booking.status})
+    # login_required only wraps sync views before Django 5.0.
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    status = await (
+        Booking.objects.filter(id=booking_id, user=user)
+        .values_list("status", flat=True)
+        .afirst()
+    )
+    if status is None:
+        return JsonResponse({"error": "Booking not found"}, status=404)
+    return JsonResponse({"status": status})
+
+
+# Seconds one status stream stays open before the browser reconnects.
+# Stays below the gunicorn timeout, which also applies to sync workers.
+STATUS_STREAM_TIMEOUT = 25
+# Seconds between keep-alive comments on an idle stream
+STATUS_STREAM_KEEPALIVE = 10
+
+
+def _status_stream_enabled(request):
+    # Sync workers would buffer the stream and be held while it's open.
+    return settings.BOOKING_STATUS_STREAM and isinstance(
+        request, ASGIRequest
+    )
+
+
+def _status_event(status):
+    return f"event: status\ndata: {json.dumps({'status': status})}\n\n"
+
+
+async def booking_status_stream(request, booking_id):
+    """
+    Server-sent events stream of a booking's status. Sends the current
+    status, then the change once the payment webhook is processed, and
+    ends when the booking is no longer Pending. Only served under ASGI
+    with BOOKING_STATUS_STREAM on; clients poll check_booking_status
+    otherwise.
+    """
+    if not _status_stream_enabled(request):
+        return JsonResponse(
+            {"error": "Status stream not available"}, status=404
+        )
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    status = await (
+        Booking.objects.filter(id=booking_id, user=user)
+        .values_list("status", flat=True)
+        .afirst()
+    )
+    if status is None:
+        return JsonResponse({"error": "Booking not found"}, status=404)
+
+    async def events(status):
+        # Reconnect after a few seconds if the stream times out.
+        yield "retry: 3000\n" + _status_event(status)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STATUS_STREAM_TIMEOUT
+        while status == "Pending" and loop.time() < deadline:
+            changed = await next_status(
+                booking_id,
+                status,
+                min(STATUS_STREAM_KEEPALIVE, deadline - loop.time()),
+            )
+            if changed is None:
+                return
+            if changed == status:
+                yield ": keep-alive\n\n"
+                continue
+            status = changed
+            yield _status_event(status)
+
+    response = StreamingHttpResponse(
+        events(status), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Don't let a proxy buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required
@@ -286,6 +495,12 @@ def cancel_booking(request, booking_id):
 ###########################
 
 
+# Stripe accepts checkout sessions expiring between 30 minutes and 24
+# hours after creation; one minute of slack for the round trip.
+CHECKOUT_MIN_DURATION = timedelta(minutes=31)
+CHECKOUT_MAX_DURATION = timedelta(hours=24)
+
+
 @login_required
 def create_checkout_session(request, booking_id):
     booking = get_object_or_404(Booking, pk=booking_id, user=request.user)
@@ -305,6 +520,18 @@ def create_checkout_session(request, booking_id):
         )
         return redirect("booking_details", booking_id=booking.id)
 
+    # The session has to expire before the hold does, or the expiry
+    # sweep could cancel a booking that is still being paid for.
+    now = timezone.now()
+    expires_at = min(hold_deadline(booking), now + CHECKOUT_MAX_DURATION)
+    if expires_at < now + CHECKOUT_MIN_DURATION:
+        messages.error(
+            request,
+            "This reservation is about to expire. Please book again.",
+            extra_tags="my_bookings",
+        )
+        return redirect("booking_details", booking_id=booking.id)
+
     stripe.api_key = settings.STRIPE_SECRET_KEY
     amount_in_cents = int(booking.total_price * 100)
 
@@ -324,17 +551,38 @@ def create_checkout_session(request, booking_id):
         ],
         mode="payment",
         success_url=request.build_absolute_uri(reverse("payment_success"))
-        + "?session_id={CHECKOUT_SESSION_ID}",
+        + f"?booking_id={booking.id}"
+        + "&session_id={CHECKOUT_SESSION_ID}",
         cancel_url=request.build_absolute_uri(reverse("payment_cancel")),
         client_reference_id=str(booking.id),
         metadata={"booking_id": str(booking.id)},
+        expires_at=int(expires_at.timestamp()),
+    )
+    # Older sessions may still expire; remember which one is current.
+    # update() so the booking's save signals don't fire.
+    Booking.objects.filter(pk=booking.pk).update(
+        checkout_session_id=session.id
     )
 
     return redirect(session.url, code=303)
 
 
 def payment_success(request):
-    return render(request, "booking/payment_success.html")
+    # The booking whose confirmation the page waits for
+    booking = None
+    booking_id = request.GET.get("booking_id", "")
+    if booking_id.isdigit() and request.user.is_authenticated:
+        booking = Booking.objects.filter(
+            pk=booking_id, user=request.user
+        ).first()
+    return render(
+        request,
+        "booking/payment_success.html",
+        {
+            "booking": booking,
+            "status_stream": _status_stream_enabled(request),
+        },
+    )
 
 
 def payment_cancel(request):
@@ -357,49 +605,21 @@ def stripe_webhook(request):
         logger.error("Invalid signature: %s", e)
         return HttpResponse(status=400)
 
-    logger.info("Received event type: %s", event.get("type"))
-
-    # Process only checkout.session.completed events.
-    if event.get("type") == "checkout.session.completed":
-        session = event["data"]["object"]
-        metadata = session.get("metadata", {})
-        logger.info("Session metadata: %s", metadata)
-        logger.info("Payment status: %s", session.get("payment_status"))
-
-        # Try to retrieve the booking ID from metadata,
-        # or fallback to client_reference_id.
-        booking_id_str = metadata.get("booking_id") or session.get(
-            "client_reference_id"
+    # Record the event once and acknowledge straight away. Stripe retries
+    # of the same event id are ignored; the process_stripe_events worker
+    # applies the booking changes.
+    stripe_event, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={"type": event["type"], "payload": json.loads(payload)},
+    )
+    if created:
+        logger.info(
+            "Recorded event %s (type: %s).",
+            stripe_event.event_id,
+            stripe_event.type,
         )
-        if booking_id_str:
-            try:
-                booking = Booking.objects.get(pk=int(booking_id_str))
-                # Update booking status only if currently Pending
-                # (waiting for payment).
-                if booking.status == "Pending":
-                    booking.status = "Confirmed"
-                    booking.save()
-                    # Send final confirmation email
-                    # after payment is received.
-                    send_booking_confirmation_email(booking)
-                    logger.info(
-                        "Booking (id: %s) updated to Confirmed.",
-                        booking_id_str,
-                    )
-                else:
-                    logger.info(
-                        "Booking (id: %s) is already updated to %s",
-                        booking_id_str,
-                        booking.status,
-                    )
-            except Booking.DoesNotExist:
-                logger.error(
-                    "Booking with id %s does not exist.", booking_id_str
-                )
-        else:
-            logger.error("No booking_id found in session metadata.")
     else:
-        logger.info("Unhandled event type: %s", event.get("type"))
+        logger.info("Ignoring duplicate event %s.", stripe_event.event_id)
 
     return HttpResponse(status=200)
 
@@ -529,15 +749,9 @@ def edit_booking(request, booking_id):
             )
             return redirect("edit_booking", booking_id=booking_id)
 
-        overlapping = (
-            Booking.objects.filter(
-                campervan=booking.campervan,
-                start_date__lt=new_end_dt,
-                end_date__gt=new_start_dt,
-            )
-            .exclude(id=booking.id)
-            .exclude(status="Cancelled")
-        )
+        overlapping = Booking.objects.overlapping(
+            booking.campervan_id, new_start_dt, new_end_dt
+        ).exclude(id=booking.id)
         if overlapping.exists():
             messages.error(
                 request,
@@ -550,7 +764,17 @@ def edit_booking(request, booking_id):
         booking.start_date = new_start_dt
         booking.end_date = new_end_dt
         booking.total_price = day_count * booking.campervan.price_per_day
-        booking.save()
+        try:
+            with transaction.atomic():
+                booking.save()
+        except IntegrityError:
+            # Lost a race with another booking (PostgreSQL constraint)
+            messages.error(
+                request,
+                "This campervan is not available for the requested dates.",
+                extra_tags="my_bookings",
+            )
+            return redirect("edit_booking", booking_id=booking_id)
 
         send_booking_changed_email(booking)
         messages.success(
@@ -638,8 +862,7 @@ def request_date_change(request, booking_id):
             "Your request has been submitted to our team for approval",
             extra_tags="my_bookings",
         )
-        send_date_change_request_received_email(booking, bcr)
-        send_date_change_request_notification_to_admin(booking, bcr)
+        send_date_change_request_emails(booking, bcr)
         return redirect("my_bookings")
 
     return render(
@@ -654,14 +877,18 @@ def request_date_change(request, booking_id):
 
 @staff_member_required
 def view_change_requests(request):
-    pending_requests = BookingChangeRequest.objects.filter(status="Pending")
-    for req in pending_requests:
-        day_count = (req.requested_end_date - req.requested_start_date).days
-        req.new_total_price = day_count * req.booking.campervan.price_per_day
+    pending_requests = (
+        BookingChangeRequest.objects.filter(status="Pending")
+        .select_related("booking__campervan", "booking__user")
+        .with_new_total_price()
+        .order_by("created_at", "id")
+    )
+    paginator = Paginator(pending_requests, 25)
+    page = paginator.get_page(request.GET.get("page"))
     return render(
         request,
         "booking/change_requests.html",
-        {"change_requests": pending_requests},
+        {"change_requests": page},
     )
 
 
@@ -672,10 +899,10 @@ def approve_change_request(request, request_id):
     )
     booking = bcr.booking
 
-    overlapping = Booking.objects.filter(
-        campervan=booking.campervan,
-        start_date__lt=bcr.requested_end_date,
-        end_date__gt=bcr.requested_start_date,
+    overlapping = Booking.objects.overlapping(
+        booking.campervan_id,
+        bcr.requested_start_date,
+        bcr.requested_end_date,
     ).exclude(id=booking.id)
     if overlapping.exists():
         messages.error(
@@ -689,10 +916,17 @@ def approve_change_request(request, request_id):
     )  # or simply use bcr.requested_start_date
     booking.end_date = bcr.requested_end_date
     booking.total_price = day_count * booking.campervan.price_per_day
-    booking.save()
-
     bcr.status = "Approved"
-    bcr.save()
+    try:
+        with transaction.atomic():
+            booking.save()
+            bcr.save()
+    except IntegrityError:
+        # Lost a race with another booking (PostgreSQL constraint)
+        messages.error(
+            request, "We're sorry. The requested dates are unavailable."
+        )
+        return redirect("view_change_requests")
 
     send_change_approval_email(booking, bcr)
     messages.success(request, f"Booking change request #{bcr.id} approved!")  # noqa
@@ -718,6 +952,9 @@ def reject_change_request(request, request_id):
 # Email confirmations
 #####################
 
+# Emails are stored in the outbox (see booking/mail.py) and delivered
+# by the send_queued_emails worker, so views never wait on SMTP.
+
 
 def send_reservation_confirmation_email(booking):
     """
@@ -733,12 +970,11 @@ def send_reservation_confirmation_email(booking):
         f"Best regards,\n\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -757,12 +993,11 @@ def send_booking_confirmation_email(booking):
         f"Best regards,\n\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -778,15 +1013,42 @@ def send_cancellation_email(booking):
         f"Best regards,\n\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
+def reservation_expired_email(booking):
+    """
+    (subject, message, from_email, recipient_list) for a reservation
+    that was cancelled because it wasn't paid in time.
+    """
+    subject = "Reservation Expired"
+    message = (
+        f"Dear {booking.user.username},\n\n"
+        f"We haven't received the payment for your reservation of {booking.campervan.name} from {booking.start_date} to {booking.end_date}, so it has been cancelled and the campervan released.\n"  # noqa
+        f"You are welcome to make a new reservation at any time.\n\n"
+        f"Best regards,\n\n"
+        f"Your Wildventures Team"
+    )
+    return (
+        subject,
+        message,
+        "no-reply@wildventures.com",
+        [booking.user.email],
+    )
+
+
+def send_reservation_expired_email(booking):
+    """
+    Tells the user an unpaid reservation has expired.
+    """
+    queue_email(*reservation_expired_email(booking))
+
+
 def send_booking_changed_email(booking):
     """
     Email confirmation after user changed booking via self service.
@@ -802,18 +1064,18 @@ def send_booking_changed_email(booking):
         f"Best regards,\n\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
-def send_date_change_request_received_email(booking, bcr):
+def date_change_request_received_email(booking, bcr):
     """
-    Inform user that date change request needs admin approval.
+    (subject, message, from_email, recipient_list) telling the user
+    that a date change request needs admin approval.
     """
     subject = "Date change request received"
     message = (
@@ -823,22 +1085,22 @@ def send_date_change_request_received_email(booking, bcr):
         f"Requested End: {bcr.requested_end_date}\n\n"
         f"Our team will review your request and notify you once it's approved or rejected."   # noqa
     )
-    send_mail(
+    return (
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
-def send_date_change_request_notification_to_admin(booking, bcr):
+def date_change_request_admin_email(booking, bcr):
     """
-    Notification for admin about pending date change request.
+    (subject, message, from_email, recipient_list) asking the admin
+    to review a date change request, or None without an admin address.
     """
     admin_email = getattr(settings, "DEFAULT_ADMIN_EMAIL", None)
     if not admin_email:
-        return
+        return None
     subject = (
         f"New date change request is awaiting approval (Booking #{booking.id})"
     )
@@ -849,15 +1111,42 @@ def send_date_change_request_notification_to_admin(booking, bcr):
         f"Requested End: {bcr.requested_end_date}\n\n"
         f"Please review this request in the admin panel."
     )
-    send_mail(
+    return (
         subject,
         message,
         "no-reply@wildventures.com",
         [admin_email],
-        fail_silently=False,
     )
 
 
+def send_date_change_request_received_email(booking, bcr):
+    """
+    Inform user that date change request needs admin approval.
+    """
+    queue_email(*date_change_request_received_email(booking, bcr))
+
+
+def send_date_change_request_notification_to_admin(booking, bcr):
+    """
+    Notification for admin about pending date change request.
+    """
+    email = date_change_request_admin_email(booking, bcr)
+    if email:
+        queue_email(*email)
+
+
+def send_date_change_request_emails(booking, bcr):
+    """
+    Queue the user's receipt and the admin notification for a new
+    date change request in one batch.
+    """
+    emails = [
+        date_change_request_received_email(booking, bcr),
+        date_change_request_admin_email(booking, bcr),
+    ]
+    queue_mass_email([email for email in emails if email])
+
+
 def send_change_approval_email(booking, bcr):
     """
     Sends email when a date change request is approved.
@@ -875,12 +1164,11 @@ def send_change_approval_email(booking, bcr):
         f"Best regards,\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -901,12 +1189,11 @@ def send_change_rejection_email(booking, bcr):
         f"Best regards,\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -924,12 +1211,11 @@ def send_cancellation_approval_email(booking, cancellation_request):
         f"Best regards,\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -947,12 +1233,11 @@ def send_cancellation_rejection_email(booking, cancellation_request):
         f"Best regards,\n"
         f"Your Wildventures Team"
     )
-    send_mail(
+    queue_email(
         subject,
         message,
         "no-reply@wildventures.com",
         [booking.user.email],
-        fail_silently=False,
     )
 
 
@@ -969,10 +1254,9 @@ def send_cancellation_request_notification_to_admin(
             f"User {booking.user.username} is requesting cancellation for Booking #{booking.id}.\n"  # noqa
             "Please review this request in the admin dashboard."
         )
-        send_mail(
+        queue_email(
             subject,
             message,
             "no-reply@wildventures.com",
             [admin_email],
-            fail_silently=False,
         )
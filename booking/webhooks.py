@@ -0,0 +1,204 @@
+import logging
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .mail import retry_delay
+from .models import Booking, StripeEvent
+from .services import reconfirm_booking
+from .views import (
+    send_booking_confirmation_email,
+    send_reservation_expired_email,
+)
+
+logger = logging.getLogger(__name__)
+
+# Give up on an event after this many failed processing attempts
+MAX_ATTEMPTS = 5
+
+
+def _session_booking_id(session):
+    # Try to retrieve the booking ID from metadata,
+    # or fallback to client_reference_id.
+    metadata = session.get("metadata") or {}
+    booking_id_str = metadata.get("booking_id") or session.get(
+        "client_reference_id"
+    )
+    if not booking_id_str:
+        logger.error("No booking_id found in session metadata.")
+    return booking_id_str
+
+
+def handle_checkout_session_completed(session):
+    """
+    Confirm the paid booking. Safe to run more than once per session.
+    A booking cancelled before the payment arrived is confirmed again
+    if its dates are still free, and refunded otherwise.
+    """
+    logger.info("Session metadata: %s", session.get("metadata") or {})
+    logger.info("Payment status: %s", session.get("payment_status"))
+
+    booking_id_str = _session_booking_id(session)
+    if not booking_id_str:
+        return
+
+    # Lock the booking so concurrent workers can't confirm it twice.
+    booking = (
+        Booking.objects.select_for_update()
+        .filter(pk=int(booking_id_str))
+        .first()
+    )
+    if booking is None:
+        logger.error("Booking with id %s does not exist.", booking_id_str)
+        return
+
+    if booking.status == "Confirmed":
+        logger.info(
+            "Booking (id: %s) is already Confirmed.", booking_id_str
+        )
+        return
+
+    if booking.status == "Cancelled":
+        # Paid after the booking expired or was cancelled: keep the
+        # booking if its dates are still free, otherwise refund.
+        if not reconfirm_booking(booking):
+            refund_session(session)
+            logger.error(
+                "Booking (id: %s) was paid after it was cancelled and "
+                "its dates are taken; the payment was refunded.",
+                booking_id_str,
+            )
+            return
+    else:
+        booking.status = "Confirmed"
+        booking.save(update_fields=["status", "updated_at"])
+    # Send final confirmation email after payment is received.
+    transaction.on_commit(lambda: send_booking_confirmation_email(booking))
+    logger.info("Booking (id: %s) updated to Confirmed.", booking_id_str)
+
+
+def refund_session(session):
+    """
+    Refund the payment of a checkout session in full. The idempotency
+    key makes a retried event refund it only once.
+    """
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.Refund.create(
+        payment_intent=session.get("payment_intent"),
+        idempotency_key=f"refund-{session.get('id')}",
+    )
+
+
+def handle_checkout_session_expired(session):
+    """
+    Release the campervan held by an unpaid booking once its latest
+    Stripe checkout session expires. Safe to run more than once per
+    session.
+    """
+    booking_id_str = _session_booking_id(session)
+    if not booking_id_str:
+        return
+
+    booking = (
+        Booking.objects.select_for_update()
+        .filter(pk=int(booking_id_str))
+        .first()
+    )
+    if booking is None:
+        logger.error("Booking with id %s does not exist.", booking_id_str)
+        return
+    if booking.status != "Pending":
+        logger.info(
+            "Booking (id: %s) is %s, nothing to expire.",
+            booking_id_str,
+            booking.status,
+        )
+        return
+    # The customer opened a newer session, which may still be paid.
+    if (
+        booking.checkout_session_id
+        and session.get("id") != booking.checkout_session_id
+    ):
+        logger.info(
+            "Ignoring expiry of superseded session %s for booking %s.",
+            session.get("id"),
+            booking_id_str,
+        )
+        return
+
+    booking.status = "Cancelled"
+    booking.save(update_fields=["status", "updated_at"])
+    transaction.on_commit(lambda: send_reservation_expired_email(booking))
+    logger.info("Booking (id: %s) expired unpaid.", booking_id_str)
+
+
+EVENT_HANDLERS = {
+    "checkout.session.completed": handle_checkout_session_completed,
+    "checkout.session.expired": handle_checkout_session_expired,
+}
+
+
+def process_stripe_event(stripe_event):
+    """
+    Apply a recorded event inside the caller's transaction.
+    """
+    handler = EVENT_HANDLERS.get(stripe_event.type)
+    if handler is None:
+        logger.info("Unhandled event type: %s", stripe_event.type)
+        return
+    handler(stripe_event.payload["data"]["object"])
+
+
+def process_pending_events(batch_size=50):
+    """
+    Process up to batch_size due events, oldest first. Failed events
+    are retried with the same backoff as queued emails.
+    Returns the number of events handled.
+    """
+    now = timezone.now()
+    event_ids = list(
+        StripeEvent.objects.filter(status="Pending", next_attempt_at__lte=now)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    handled = 0
+    for event_id in event_ids:
+        with transaction.atomic():
+            stripe_event = (
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(pk=event_id, status="Pending")
+                .first()
+            )
+            if stripe_event is None:
+                # Another worker got there first.
+                continue
+            try:
+                with transaction.atomic():
+                    process_stripe_event(stripe_event)
+            except Exception as e:
+                logger.exception("Failed to process event %s", event_id)
+                stripe_event.attempts += 1
+                stripe_event.last_error = str(e)
+                if stripe_event.attempts >= MAX_ATTEMPTS:
+                    stripe_event.status = "Failed"
+                else:
+                    stripe_event.next_attempt_at = timezone.now() + (
+                        retry_delay(stripe_event.attempts)
+                    )
+            else:
+                stripe_event.attempts += 1
+                stripe_event.status = "Processed"
+                stripe_event.processed_at = timezone.now()
+            stripe_event.save(
+                update_fields=[
+                    "status",
+                    "attempts",
+                    "next_attempt_at",
+                    "last_error",
+                    "processed_at",
+                ]
+            )
+        handled += 1
+    return handled
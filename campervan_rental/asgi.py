@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campervan_rental.settings')
 
 application = get_asgi_application()
+
+# Optional in-process sweeper for unpaid reservations
+from booking.expiry import start_expiry_scheduler  # noqa: E402
+
+start_expiry_scheduler()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import ssl
+import sys
 import certifi
 from pathlib import Path
 import os
@@ -112,24 +113,106 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "campervan_rental.wsgi.application"
 
+# The same switch gunicorn.conf.py reads: "wsgi" or "asgi".
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "wsgi")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connection reuse (DB_POOL_MODE):
+# - "persistent" (default): each worker keeps its connection open for
+#   DB_CONN_MAX_AGE seconds and health-checks it before reuse.
+# - "pgbouncer": a server-side pooler (transaction pooling) sits in front
+#   of PostgreSQL; keep the cheap connection to it and disable
+#   server-side cursors, which don't survive transaction pooling.
+# - "off": open a new connection for every request.
+# Under SERVER_PROFILE=asgi, sync views run in a thread pool and every
+# thread keeps its own persistent connection, which can exhaust
+# PostgreSQL's max_connections. There DB_CONN_MAX_AGE is forced to 0
+# unless connections are pooled externally ("pgbouncer").
+DB_POOL_MODE = os.environ.get("DB_POOL_MODE", "persistent")
+DB_CONN_MAX_AGE = (
+    0
+    if DB_POOL_MODE == "off"
+    or (SERVER_PROFILE == "asgi" and DB_POOL_MODE != "pgbouncer")
+    else int(os.environ.get("DB_CONN_MAX_AGE", 600))
+)
+
 # Default database: SQLite (for development or troubleshooting purposes)
 
 if "DATABASE_URL" in os.environ:
     DATABASES = {
-        "default": dj_database_url.parse(os.environ.get("DATABASE_URL"))
+        "default": dj_database_url.parse(
+            os.environ.get("DATABASE_URL"),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_MAX_AGE > 0,
+        )
     }
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_MAX_AGE > 0,
         }
     }
 
+if DB_POOL_MODE == "pgbouncer":
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Local memory by default; set CACHE_BACKEND to "file" or "redis"
+# to share the cache between workers.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+CACHE_TIMEOUT = int(os.environ.get("CACHE_TIMEOUT", 300))
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+            "TIMEOUT": CACHE_TIMEOUT,
+            "KEY_PREFIX": "wildventures",
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "CACHE_LOCATION", os.path.join(BASE_DIR, ".cache")
+            ),
+            "TIMEOUT": CACHE_TIMEOUT,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": CACHE_TIMEOUT,
+        }
+    }
+
+# Whether every process (web workers, background workers) sees the
+# same cache
+SHARED_CACHE = CACHE_BACKEND != "locmem"
+
+# How long anonymous renders of the static pages are cached
+CACHE_PAGE_TIMEOUT = int(os.environ.get("CACHE_PAGE_TIMEOUT", 60 * 15))
+
+# Answer availability checks from cached per-campervan occupancy
+# bitmaps. They are invalidated through the cache, so this needs a
+# cache shared by every process (web, expiry and webhook workers) and
+# is off by default with the per-process locmem backend.
+OCCUPANCY_BITMAP = (
+    os.environ.get("OCCUPANCY_BITMAP", str(SHARED_CACHE)) == "True"
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -167,15 +250,53 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 
-STATICFILES_STORAGE = (
-    "cloudinary_storage.storage.StaticHashedCloudinaryStorage"
-)
+# Static files are hashed and pre-compressed (gzip + brotli) by
+# collectstatic and served by WhiteNoise; hashed names get far-future
+# cache headers. Set STATIC_STORAGE to "cloudinary" to upload them to
+# Cloudinary instead.
+STATIC_STORAGE = os.environ.get("STATIC_STORAGE", "whitenoise")
+if STATIC_STORAGE == "cloudinary":
+    STATICFILES_STORAGE = (
+        "cloudinary_storage.storage.StaticHashedCloudinaryStorage"
+    )
+else:
+    STATICFILES_STORAGE = "core.storage.StaticFilesStorage"
+    # The test suite doesn't run collectstatic, so it skips the
+    # strict manifest lookup.
+    if sys.argv[1:2] == ["test"]:
+        STATICFILES_STORAGE = (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+        )
+    # cloudinary_storage's collectstatic only uploads to Cloudinary, so
+    # let the stock command from django.contrib.staticfiles win.
+    INSTALLED_APPS.remove("cloudinary_storage")
+    INSTALLED_APPS.insert(
+        INSTALLED_APPS.index("django.contrib.staticfiles") + 1,
+        "cloudinary_storage",
+    )
+# Unhashed files (favicon links, admin fallbacks) are cached for a day
+WHITENOISE_MAX_AGE = int(os.environ.get("WHITENOISE_MAX_AGE", 60 * 60 * 24))
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 MEDIA_URL = "/media/"
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", os.path.join(BASE_DIR, "media"))
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# Campervan images: Cloudinary by default, or set IMAGE_STORAGE to
+# "local" to keep them under MEDIA_ROOT with pre-generated thumbnails
+# (needs Pillow) for working and load testing without network access.
+IMAGE_STORAGE = os.environ.get("IMAGE_STORAGE", "cloudinary")
+if IMAGE_STORAGE == "local":
+    IMAGE_BACKEND = "core.images.LocalImageBackend"
+    DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+else:
+    IMAGE_BACKEND = "core.images.CloudinaryImageBackend"
+# Generate local thumbnails in a background thread after upload
+IMAGE_DERIVATIVES_ASYNC = (
+    os.environ.get("IMAGE_DERIVATIVES_ASYNC", "True") == "True"
+)
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -184,7 +305,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 # Email settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# SMTP backend that reuses one connection per worker thread
+EMAIL_BACKEND = os.getenv(
+    "EMAIL_BACKEND", "booking.backends.PooledEmailBackend"
+)
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -194,6 +318,18 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 DEFAULT_ADMIN_EMAIL = os.getenv("DEFAULT_ADMIN_EMAIL")
 ACCOUNT_EMAIL_REQUIRED = True
 
+# Unpaid (Pending) reservations are cancelled after this many days
+BOOKING_HOLD_DAYS = int(os.environ.get("BOOKING_HOLD_DAYS", 3))
+# Seconds between in-process expiry sweeps; 0 leaves it to the
+# expire_pending_bookings worker
+BOOKING_EXPIRY_INTERVAL = int(os.environ.get("BOOKING_EXPIRY_INTERVAL", 0))
+
+# Booking status changes are pushed over server-sent events only under
+# ASGI (sync workers buffer the stream and are held for its whole
+# length) and when the cache carries them between processes; otherwise
+# the payment page polls the status endpoint.
+BOOKING_STATUS_STREAM = SERVER_PROFILE == "asgi" and SHARED_CACHE
+
 # Stripe settings
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
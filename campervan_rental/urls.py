@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from django.views.static import serve
 from django.contrib.auth import views as auth_views
 
 
@@ -9,4 +11,16 @@ urlpatterns = [
     path("users/", include("users.urls")),  # Include users app URLs
     path("", include("core.urls")),  # Include core app URLs
     path("booking/", include("booking.urls")),  # Include booking app URLs
+    path("search/", include("search.urls")),  # Include search app URLs
 ]
+
+# Local image storage (IMAGE_STORAGE=local) serves its own files,
+# so image-heavy pages can be load-tested without Cloudinary.
+if settings.IMAGE_STORAGE == "local":
+    urlpatterns += [
+        re_path(
+            r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"),
+            serve,
+            {"document_root": settings.MEDIA_ROOT},
+        ),
+    ]
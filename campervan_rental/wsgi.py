@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campervan_rental.settings')
 
 application = get_wsgi_application()
+
+# Optional in-process sweeper for unpaid reservations
+from booking.expiry import start_expiry_scheduler  # noqa: E402
+
+start_expiry_scheduler()
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from .forms import LocalImageCampervanForm
+from .images import get_image_backend
 from .models import Campervan
 
 
@@ -14,3 +16,9 @@ class CampervanAdmin(admin.ModelAdmin):
     )
     list_filter = ("availability_status", "location")  # Filter by these fields
     search_fields = ("name", "location")  # Search by name and location
+
+    def get_form(self, request, obj=None, **kwargs):
+        # Local image storage saves uploads itself
+        if get_image_backend().local_uploads:
+            kwargs["form"] = LocalImageCampervanForm
+        return super().get_form(request, obj, **kwargs)
@@ -0,0 +1,93 @@
+import math
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the block against a throwaway test database, created the same
+    way the test runner does, so benchmarks never touch real data.
+    Also works under the test runner, next to its own test database.
+    """
+    try:
+        setup_test_environment()
+        own_environment = True
+    except RuntimeError:
+        # Already set up by the test runner.
+        own_environment = False
+    # Set the current connection aside; the test runner's may hold an
+    # in-memory database that must survive the block.
+    previous = connections[DEFAULT_DB_ALIAS]
+    del connections[DEFAULT_DB_ALIAS]
+    test_settings = connection.settings_dict["TEST"]
+    test_name = test_settings["NAME"]
+    tmpdir = None
+    if connection.vendor == "sqlite":
+        # Django never closes in-memory SQLite connections,
+        # so use a file to measure real connection handling.
+        tmpdir = tempfile.mkdtemp()
+        test_settings["NAME"] = os.path.join(tmpdir, "benchmark.sqlite3")
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = test_name
+        connections[DEFAULT_DB_ALIAS] = previous
+        if own_environment:
+            teardown_test_environment()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """
+    Throughput and latency percentiles (in ms) for one benchmark run.
+    """
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": (
+            round(len(latencies) / elapsed, 1) if elapsed else 0.0
+        ),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class QueryCounter:
+    """
+    Count the queries run on this thread's database connection, for use
+    as connection.execute_wrapper(counter).
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
@@ -0,0 +1,77 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+
+def _version_key(name):
+    return f"core:version:{name}"
+
+
+def get_cache_version(name):
+    """
+    Current version of a group of cached data ("campervans",
+    "bookings"). Cache keys embed it, so bumping the version
+    invalidates every entry built from that data.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Start from a timestamp so an evicted counter never
+        # reuses the version of entries that are still cached.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(name):
+    """
+    Invalidate every cache entry keyed on the given version.
+    """
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), time.time_ns(), None)
+
+
+def listing_cache_key(prefix, request, versions, ignore=()):
+    """
+    Cache key for a listing fragment, built from the normalised
+    query string (minus the ignored parameters) and the current
+    versions of the data it shows.
+    """
+    query = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if key not in ignore
+        for value in values
+    )
+    digest = hashlib.md5(repr(query).encode()).hexdigest()
+    version = ".".join(str(get_cache_version(name)) for name in versions)
+    return f"{prefix}:{version}:{digest}"
+
+
+def cache_anonymous_page(timeout):
+    """
+    Like ``cache_page``, but only for anonymous requests with no
+    pending flash messages. Everyone else gets a fresh render, so a
+    page showing a username or a message is never stored or served
+    from the shared cache.
+    """
+    def decorator(view_func):
+        cached_view = cache_page(timeout)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Reading the user touches the session, so the session
+            # middleware adds "Vary: Cookie" to the response.
+            if request.user.is_authenticated or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+            return cached_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
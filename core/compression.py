@@ -0,0 +1,70 @@
+import re
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+ACCEPTS_BROTLI = re.compile(r"\bbr\b")
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+# Brotli's default quality (11) is too slow to run per response
+BROTLI_QUALITY = 5
+
+
+def _encode(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return compress_string(body)
+
+
+def compress_content(view_func):
+    """
+    Brotli- or gzip-compress successful responses the client accepts
+    compressed. Bodies with an ETag are compressed once and cached.
+    Like GZipMiddleware, the ETag is made weak as the bytes differ per
+    encoding; conditional requests still match it.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if (
+            response.status_code != 200
+            or response.streaming
+            or response.has_header("Content-Encoding")
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is not None and ACCEPTS_BROTLI.search(accept):
+            encoding = "br"
+        elif ACCEPTS_GZIP.search(accept):
+            encoding = "gzip"
+        else:
+            return response
+
+        etag = response.get("ETag")
+        cache_key = f"core:compressed:{encoding}:{etag}" if etag else None
+        compressed = cache.get(cache_key) if cache_key else None
+        if compressed is None:
+            compressed = _encode(response.content, encoding)
+            if cache_key:
+                cache.set(cache_key, compressed)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        if etag and not etag.startswith("W/"):
+            response["ETag"] = "W/" + etag
+        return response
+
+    return wrapper
@@ -0,0 +1,88 @@
+import hashlib
+import json
+from collections import Counter
+
+from django.core.cache import cache
+
+from .models import Campervan
+
+FACET_INDEX_CACHE_KEY = "core:facet_index"
+FACET_PAYLOAD_CACHE_KEY = "core:facet_payload"
+
+# Facets the campervan_list filters need on the client
+CLIENT_FACETS = ("brands", "models", "brand_models", "model_brands", "campers")
+
+
+def build_facet_index():
+    """
+    Build the brand/model/capacity facets of the whole fleet
+    from a single query.
+    """
+    rows = list(Campervan.objects.values("brand", "model", "capacity"))
+
+    brands = sorted({row["brand"] for row in rows if row["brand"] is not None})
+    models = sorted({row["model"] for row in rows if row["model"] is not None})
+
+    # Brands and models are matched case-insensitively,
+    # so group the pairs by their lowercased value.
+    models_by_brand = {}
+    brands_by_model = {}
+    for row in rows:
+        brand, model = row["brand"], row["model"]
+        if brand is not None and model is not None:
+            models_by_brand.setdefault(brand.lower(), set()).add(model)
+            brands_by_model.setdefault(model.lower(), set()).add(brand)
+
+    brand_models = {
+        brand: sorted(models_by_brand.get(brand.lower(), ()))
+        for brand in brands
+    }
+    model_brands = {
+        model: sorted(brands_by_model.get(model.lower(), ()))
+        for model in models
+    }
+    capacity_counts = Counter(row["capacity"] for row in rows)
+
+    return {
+        "brands": brands,
+        "models": models,
+        "brand_models": brand_models,
+        "model_brands": model_brands,
+        "capacities": dict(sorted(capacity_counts.items())),
+        "campers": rows,
+    }
+
+
+def get_facet_index():
+    """
+    Return the cached facet index, building it on a cache miss.
+    """
+    index = cache.get(FACET_INDEX_CACHE_KEY)
+    if index is None:
+        index = build_facet_index()
+        cache.set(FACET_INDEX_CACHE_KEY, index)
+    return index
+
+
+def get_facet_payload():
+    """
+    The client-side facets as (JSON bytes, ETag), serialised once
+    per facet index.
+    """
+    payload = cache.get(FACET_PAYLOAD_CACHE_KEY)
+    if payload is None:
+        index = get_facet_index()
+        body = json.dumps(
+            {name: index[name] for name in CLIENT_FACETS},
+            separators=(",", ":"),
+        ).encode()
+        payload = (body, hashlib.md5(body).hexdigest())
+        cache.set(FACET_PAYLOAD_CACHE_KEY, payload)
+    return payload
+
+
+def invalidate_facet_index():
+    """
+    Drop the cached facet index so the next request rebuilds it.
+    """
+    cache.delete_many([FACET_INDEX_CACHE_KEY, FACET_PAYLOAD_CACHE_KEY])
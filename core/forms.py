@@ -1,4 +1,6 @@
 from django import forms
+from .images import get_image_backend
+from .models import Campervan
 
 
 class ContactForm(forms.Form):
@@ -10,3 +12,33 @@ class ContactForm(forms.Form):
         widget=forms.Textarea(attrs={"rows": 5}),
         label="Message",
     )
+
+
+class LocalImageCampervanForm(forms.ModelForm):
+    """
+    Admin form for local image storage: the upload is saved by the
+    image backend instead of being sent to Cloudinary. It is only
+    written once the form is saved, so rejected forms leave no files.
+    """
+
+    image = forms.FileField(required=False)
+    upload = None
+
+    class Meta:
+        model = Campervan
+        fields = "__all__"
+
+    def clean_image(self):
+        upload = self.cleaned_data.get("image")
+        if upload:
+            self.upload = upload
+            return upload.name
+        if not self.instance.image:
+            raise forms.ValidationError("Please upload an image.")
+        return self.instance.image
+
+    def save(self, commit=True):
+        if self.upload and not self.errors:
+            self.instance.image = get_image_backend().save(self.upload)
+            self.upload = None
+        return super().save(commit)
@@ -0,0 +1,173 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed for local derivatives
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Widths (px) offered to the browser in campervan image srcsets
+IMAGE_WIDTHS = (320, 480, 640, 960)
+
+# (file extension, Pillow format) of the local derivatives
+DERIVATIVE_FORMATS = (("jpg", "JPEG"), ("webp", "WEBP"))
+
+
+def image_name(image):
+    """
+    File name of a Campervan.image value, which is a plain string when
+    just assigned and a CloudinaryResource once read from the database.
+    """
+    if isinstance(image, CloudinaryResource):
+        if image.format:
+            return f"{image.public_id}.{image.format}"
+        return image.public_id or ""
+    return str(image or "")
+
+
+class CloudinaryImageBackend:
+    """
+    Images stored on Cloudinary, resized on the fly from transformation
+    URLs, so there is nothing to generate after upload.
+    """
+
+    def url(self, image, width=None, image_format="auto"):
+        if isinstance(image, str):
+            image = CloudinaryResource(image)
+        options = {
+            "quality": "auto",
+            "fetch_format": image_format,
+            "secure": True,
+        }
+        if width:
+            options.update(width=width, crop="limit")
+        return image.build_url(**options)
+
+    # Uploads go through the CloudinaryField form field
+    local_uploads = False
+
+    def schedule_derivatives(self, name):
+        pass
+
+
+class LocalImageBackend:
+    """
+    Images stored under MEDIA_ROOT/campervans, for working and load
+    testing without network access. Resized JPEG and WebP copies are
+    generated once after upload (in a background thread unless
+    IMAGE_DERIVATIVES_ASYNC is off); until they exist, and without
+    Pillow, the original is served.
+    """
+
+    directory = "campervans"
+    local_uploads = True
+
+    def __init__(self):
+        self.storage = FileSystemStorage(
+            location=os.path.join(settings.MEDIA_ROOT, self.directory),
+            base_url=f"{settings.MEDIA_URL}{self.directory}/",
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="image-derivatives"
+        )
+
+    def derivative_name(self, name, width, extension):
+        stem = os.path.splitext(name)[0]
+        return f"derived/{stem}-{width}.{extension}"
+
+    def url(self, image, width=None, image_format="auto"):
+        name = image_name(image)
+        if not width or Image is None:
+            return self.storage.url(name)
+        # Only the IMAGE_WIDTHS are generated, use the next one up.
+        width = next(
+            (w for w in IMAGE_WIDTHS if w >= width), IMAGE_WIDTHS[-1]
+        )
+        extension = "jpg" if image_format in ("jpg", "jpeg") else "webp"
+        derivative = self.derivative_name(name, width, extension)
+        # Serve the original until generate_derivatives() has run.
+        if not self.storage.exists(derivative):
+            return self.storage.url(name)
+        return self.storage.url(derivative)
+
+    def save(self, uploaded_file):
+        """
+        Store an uploaded image and return the name to keep in
+        Campervan.image.
+        """
+        return self.storage.save(
+            os.path.basename(uploaded_file.name), uploaded_file
+        )
+
+    def generate_derivatives(self, name):
+        """
+        Write the resized JPEG and WebP copies of one image.
+        Returns the number of files written.
+        """
+        if Image is None or not self.storage.exists(name):
+            return 0
+        written = 0
+        with self.storage.open(name) as source, Image.open(source) as image:
+            original = image.convert("RGB")
+        for width in IMAGE_WIDTHS:
+            resized = original.copy()
+            resized.thumbnail((width, width * 4))
+            for extension, pil_format in DERIVATIVE_FORMATS:
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, quality=80)
+                target = self.derivative_name(name, width, extension)
+                if self.storage.exists(target):
+                    self.storage.delete(target)
+                self.storage.save(target, ContentFile(buffer.getvalue()))
+                written += 1
+        return written
+
+    def schedule_derivatives(self, name):
+        """
+        Generate the derivatives of a newly saved image, unless the
+        largest one already exists.
+        """
+        if Image is None or not name:
+            return
+        largest = self.derivative_name(name, IMAGE_WIDTHS[-1], "webp")
+        if self.storage.exists(largest):
+            return
+        if getattr(settings, "IMAGE_DERIVATIVES_ASYNC", True):
+            future = self.executor.submit(self.generate_derivatives, name)
+            future.add_done_callback(self._log_failure)
+        else:
+            self.generate_derivatives(name)
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception():
+            logger.error(
+                "Generating image derivatives failed: %s", future.exception()
+            )
+
+
+@lru_cache(maxsize=None)
+def get_image_backend():
+    """
+    The image backend selected by settings.IMAGE_BACKEND.
+    """
+    return import_string(settings.IMAGE_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_image_backend(setting, **kwargs):
+    if setting in ("IMAGE_BACKEND", "MEDIA_ROOT", "MEDIA_URL"):
+        get_image_backend.cache_clear()
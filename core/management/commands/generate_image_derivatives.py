@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.images import get_image_backend, image_name
+from core.models import Campervan
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized image copies for every campervan "
+        "(local image storage only)."
+    )
+
+    def handle(self, *args, **options):
+        backend = get_image_backend()
+        if not hasattr(backend, "generate_derivatives"):
+            self.stdout.write("The image backend resizes on the fly.")
+            return
+        written = 0
+        for image in Campervan.objects.values_list("image", flat=True):
+            if image:
+                written += backend.generate_derivatives(image_name(image))
+        self.stdout.write(f"Wrote {written} image file(s).")
@@ -0,0 +1,387 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import reverse
+
+from booking.models import Booking
+from core.benchmarks import QueryCounter, benchmark_database, summarize
+from core.models import Campervan
+
+# Share of requests per scenario, roughly what the site sees around a
+# busy booking season.
+DEFAULT_MIX = {
+    "campervan_list": 30,
+    "check_availability": 15,
+    "booking_check_availability": 15,
+    "my_bookings": 15,
+    "book_campervan": 15,
+    "stripe_webhook": 10,
+}
+
+BRANDS = ["Volkswagen", "Ford", "Mercedes", "Fiat"]
+MODELS = ["California", "Transit", "Marco Polo", "Ducato"]
+
+
+def parse_mix(value):
+    """
+    "name=weight,name=weight" -> {name: weight}, for --mix.
+    """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(
+                f"Unknown scenario {name!r}. "
+                f"Choose from {', '.join(DEFAULT_MIX)}."
+            )
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Invalid weight for {name}: {weight!r}"
+            )
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a realistic traffic mix (listing, availability checks, "
+        "bookings, my bookings and a stubbed Stripe webhook) at a given "
+        "concurrency against a throwaway test database, and report "
+        "throughput, latency percentiles and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Total number of requests.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Client threads sending requests at the same time.",
+        )
+        parser.add_argument(
+            "--campervans",
+            type=int,
+            default=50,
+            help="Campervans in the seeded fleet.",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=500,
+            help="Bookings seeded before the run.",
+        )
+        parser.add_argument(
+            "--mix",
+            type=parse_mix,
+            default=DEFAULT_MIX,
+            help="Scenario weights, e.g. campervan_list=50,my_bookings=50.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=1,
+            help="Random seed, so runs send the same requests.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results as JSON to this file.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON results of an earlier run to compare against.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--requests and --concurrency must be >= 1.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        with benchmark_database():
+            cache.clear()
+            self.seed_data(options)
+            # Signatures can't be produced without the Stripe secret.
+            with patch(
+                "booking.views.stripe.Webhook.construct_event",
+                side_effect=lambda payload, *args: json.loads(payload),
+            ):
+                results = self.run(options)
+            results["database"] = connection.vendor
+        cache.clear()
+
+        self.report(results, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+    def seed_data(self, options):
+        rng = random.Random(options["seed"])
+        self.users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"loadtest{i}",
+                    email=f"loadtest{i}@example.com",
+                )
+                for i in range(options["concurrency"])
+            ]
+        )
+        self.campervans = [
+            Campervan.objects.create(
+                name=f"Load Test Campervan {i}",
+                description="Campervan for load testing.",
+                price_per_day=rng.randrange(60, 250),
+                image="loadtest.jpg",
+                capacity=rng.randrange(2, 7),
+                location="Load Test Location",
+                brand=BRANDS[i % len(BRANDS)],
+                model=MODELS[i % len(MODELS)],
+            )
+            for i in range(options["campervans"])
+        ]
+        today = date.today()
+        bookings = []
+        for _ in range(options["bookings"]):
+            start = today + timedelta(days=rng.randrange(5, 365))
+            days = rng.randrange(2, 15)
+            bookings.append(
+                Booking(
+                    user=rng.choice(self.users),
+                    campervan=rng.choice(self.campervans),
+                    start_date=start,
+                    end_date=start + timedelta(days=days),
+                    total_price=days * 100,
+                    status=rng.choice(["Pending", "Confirmed", "Cancelled"]),
+                )
+            )
+        self.booking_ids = [
+            booking.pk for booking in Booking.objects.bulk_create(bookings)
+        ]
+
+    def run(self, options):
+        mix = options["mix"]
+        rng = random.Random(options["seed"])
+        plan = rng.choices(
+            list(mix), weights=list(mix.values()), k=options["requests"]
+        )
+        local = threading.local()
+        workers = iter(range(options["concurrency"]))
+        workers_lock = threading.Lock()
+
+        def send(task):
+            index, scenario = task
+            if not hasattr(local, "client"):
+                with workers_lock:
+                    worker = next(workers)
+                local.client = Client(raise_request_exception=False)
+                local.client.force_login(self.users[worker])
+                local.rng = random.Random(options["seed"] + worker)
+                local.counter = QueryCounter()
+            method, url, data = getattr(self, f"request_{scenario}")(
+                local.rng, index
+            )
+            local.counter.count = 0
+            started = time.perf_counter()
+            with connection.execute_wrapper(local.counter):
+                if method == "post_json":
+                    response = local.client.post(
+                        url, data=data, content_type="application/json"
+                    )
+                elif method == "post":
+                    response = local.client.post(url, data)
+                else:
+                    response = local.client.get(url, data)
+            latency = time.perf_counter() - started
+            # The test client skips the close_old_connections()
+            # handlers the WSGI handler runs around each request.
+            close_old_connections()
+            return (
+                scenario,
+                latency,
+                local.counter.count,
+                response.status_code,
+            )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            samples = list(pool.map(send, enumerate(plan)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "version": 1,
+            "django": django.get_version(),
+            "options": {
+                key: options[key]
+                for key in (
+                    "requests",
+                    "concurrency",
+                    "campervans",
+                    "bookings",
+                    "mix",
+                    "seed",
+                )
+            },
+            "overall": self.summarize(samples, elapsed),
+            "endpoints": {
+                scenario: self.summarize(
+                    [sample for sample in samples if sample[0] == scenario],
+                    elapsed,
+                )
+                for scenario in mix
+                if scenario in plan
+            },
+        }
+
+    def summarize(self, samples, elapsed):
+        result = summarize([sample[1] for sample in samples], elapsed)
+        queries = [sample[2] for sample in samples]
+        result["queries_per_request"] = (
+            round(sum(queries) / len(queries), 2) if queries else 0.0
+        )
+        result["max_queries"] = max(queries, default=0)
+        status_codes = {}
+        for sample in samples:
+            status_codes[str(sample[3])] = (
+                status_codes.get(str(sample[3]), 0) + 1
+            )
+        result["status_codes"] = status_codes
+        result["errors"] = sum(
+            count
+            for code, count in status_codes.items()
+            if int(code) >= 500
+        )
+        return result
+
+    # Scenarios: each returns (method, url, data) for one request.
+
+    def random_period(self, rng):
+        start = date.today() + timedelta(days=rng.randrange(5, 365))
+        return start, start + timedelta(days=rng.randrange(2, 15))
+
+    def request_campervan_list(self, rng, index):
+        filters = {}
+        if rng.random() < 0.5:
+            filters["brand"] = rng.choice(BRANDS)
+        if rng.random() < 0.3:
+            filters["model"] = rng.choice(MODELS)
+        if rng.random() < 0.3:
+            filters["capacity"] = rng.randrange(2, 7)
+        if rng.random() < 0.3:
+            filters["max_price"] = rng.randrange(100, 260, 20)
+        if rng.random() < 0.2:
+            filters["q"] = rng.choice(BRANDS + MODELS)
+        if rng.random() < 0.3:
+            start, end = self.random_period(rng)
+            filters["start_date"] = start.isoformat()
+            filters["end_date"] = end.isoformat()
+        return "get", reverse("campervan_list"), filters
+
+    def availability_query(self, rng):
+        start, end = self.random_period(rng)
+        return {
+            "campervan_id": rng.choice(self.campervans).pk,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+        }
+
+    def request_check_availability(self, rng, index):
+        return "get", "/check-availability/", self.availability_query(rng)
+
+    def request_booking_check_availability(self, rng, index):
+        return (
+            "get",
+            "/booking/check-availability/",
+            self.availability_query(rng),
+        )
+
+    def request_my_bookings(self, rng, index):
+        return "get", reverse("my_bookings"), {}
+
+    def request_book_campervan(self, rng, index):
+        start, end = self.random_period(rng)
+        return (
+            "post",
+            reverse(
+                "book_campervan", args=[rng.choice(self.campervans).pk]
+            ),
+            {"start_date": start.isoformat(), "end_date": end.isoformat()},
+        )
+
+    def request_stripe_webhook(self, rng, index):
+        event = {
+            "id": f"evt_loadtest_{index}",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "data": {
+                "object": {
+                    "id": f"cs_loadtest_{index}",
+                    "metadata": {
+                        "booking_id": str(rng.choice(self.booking_ids))
+                    },
+                }
+            },
+        }
+        return "post_json", reverse("stripe_webhook"), json.dumps(event)
+
+    def report(self, results, baseline=None):
+        rows = [("overall", results["overall"])] + list(
+            results["endpoints"].items()
+        )
+        self.stdout.write(
+            f"{'scenario':<28}{'requests':>9}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}"
+        )
+        for name, result in rows:
+            self.stdout.write(
+                f"{name:<28}{result['requests']:>9}"
+                f"{result['requests_per_second']:>9}"
+                f"{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                f"{result['p99_ms']:>9}"
+                f"{result['queries_per_request']:>9}"
+                f"{result['errors']:>8}"
+            )
+        if baseline is None:
+            return
+
+        self.stdout.write("Compared with the baseline run:")
+        previous = dict(
+            [("overall", baseline["overall"])]
+            + list(baseline.get("endpoints", {}).items())
+        )
+        for name, result in rows:
+            before = previous.get(name)
+            if before is None:
+                continue
+            throughput = self.change(before, result, "requests_per_second")
+            p95 = self.change(before, result, "p95_ms")
+            queries = self.change(before, result, "queries_per_request")
+            self.stdout.write(
+                f"{name:<28}req/s {throughput}, p95 {p95}, "
+                f"queries {queries}"
+            )
+
+    def change(self, before, after, key):
+        if not before[key]:
+            return f"{after[key]}"
+        return f"{(after[key] - before[key]) / before[key]:+.1%}"
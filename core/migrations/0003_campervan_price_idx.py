@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_campervan_brand_campervan_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campervan',
+            index=models.Index(fields=['price_per_day', 'id'], name='campervan_price_idx'),
+        ),
+    ]
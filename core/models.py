@@ -1,5 +1,6 @@
 from django.db import models
 from cloudinary.models import CloudinaryField
+from .images import IMAGE_WIDTHS, get_image_backend
 
 
 # Stores details about campervans
@@ -18,13 +19,38 @@ class Campervan(models.Model):
         max_length=50, blank=True, null=True
     )  # Vehicle model
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order of campervan_list
+            models.Index(
+                fields=["price_per_day", "id"], name="campervan_price_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
     def is_available(self, start_date, end_date):
         """Check if campervan is available for the given date range."""
-        overlapping_bookings = self.booking_set.filter(
-            models.Q(start_date__lte=end_date)
-            & models.Q(end_date__gte=start_date)
+        overlapping_bookings = self.bookings.overlapping(
+            self, start_date, end_date
         )
         return not overlapping_bookings.exists()
+
+    def image_url(self, width=None, image_format="auto"):
+        """
+        URL of the image scaled down to width, from the configured
+        image backend. image_format="auto" picks the best format the
+        backend offers (Cloudinary: AVIF/WebP/JPEG per browser);
+        "webp", "avif" or "jpg" ask for one.
+        """
+        if not self.image:
+            return ""
+        return get_image_backend().url(self.image, width, image_format)
+
+    def image_srcset(self, widths=IMAGE_WIDTHS, image_format="auto"):
+        """srcset attribute value with one resized URL per width."""
+        return ", ".join(
+            f"{self.image_url(width, image_format)} {width}w"
+            for width in widths
+        )
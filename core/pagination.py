@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+
+def encode_cursor(price, pk, direction):
+    """
+    Opaque token for the position just after ("n") or before ("p")
+    the campervan with the given (price_per_day, id).
+    """
+    raw = json.dumps([str(price), pk, direction]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    (price, id, direction) of a cursor, or None if it isn't valid.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        price, pk, direction = json.loads(raw)
+        price = Decimal(price)
+        if (
+            direction not in ("n", "p")
+            or type(pk) is not int
+            or not price.is_finite()
+        ):
+            return None
+        return price, pk, direction
+    except (
+        binascii.Error,
+        InvalidOperation,
+        OverflowError,
+        TypeError,
+        UnicodeDecodeError,
+        ValueError,
+    ):
+        return None
+
+
+class CursorPage:
+    """
+    One page of a keyset-paginated listing ordered by (price_per_day, id).
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, count):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def cursor_paginate(campervans, cursor, per_page, count=None):
+    """
+    Keyset pagination on (price_per_day, id): each page is one indexed
+    range query of per_page + 1 rows, however deep it is. Invalid
+    cursors start from the first page.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is None:
+        rows = list(
+            campervans.order_by("price_per_day", "id")[: per_page + 1]
+        )
+        has_more, has_before = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        price, pk, direction = position
+        if direction == "n":
+            rows = list(
+                campervans.filter(
+                    Q(price_per_day__gt=price)
+                    | Q(price_per_day=price, id__gt=pk)
+                ).order_by("price_per_day", "id")[: per_page + 1]
+            )
+            has_more, has_before = len(rows) > per_page, True
+            rows = rows[:per_page]
+        else:
+            rows = list(
+                campervans.filter(
+                    Q(price_per_day__lt=price)
+                    | Q(price_per_day=price, id__lt=pk)
+                ).order_by("-price_per_day", "-id")[: per_page + 1]
+            )
+            has_before, has_more = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+
+    next_cursor = previous_cursor = None
+    if rows and has_more:
+        next_cursor = encode_cursor(rows[-1].price_per_day, rows[-1].id, "n")
+    if rows and has_before:
+        previous_cursor = encode_cursor(
+            rows[0].price_per_day, rows[0].id, "p"
+        )
+    return CursorPage(rows, next_cursor, previous_cursor, count)
+
+
+def approximate_count(queryset, cache_key):
+    """
+    Row count of a listing, cached on its own so paging through the
+    listing doesn't recount it. Close enough for "about N results".
+    """
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, settings.CACHE_TIMEOUT)
+    return count
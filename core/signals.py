@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from booking.models import Booking
+from .caching import bump_cache_version
+from .facets import invalidate_facet_index
+from .images import get_image_backend, image_name
+from .models import Campervan
+
+
+@receiver(post_save, sender=Campervan)
+@receiver(post_delete, sender=Campervan)
+def invalidate_campervan_caches(sender, instance, **kwargs):
+    """
+    Rebuild the facets and listings after any fleet change.
+    """
+    invalidate_facet_index()
+    bump_cache_version("campervans")
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_caches(sender, instance, **kwargs):
+    """
+    Bookings change date-filtered listings. Invalidated on commit, so a
+    concurrent request can't re-cache the listing from before it.
+    """
+    transaction.on_commit(lambda: bump_cache_version("bookings"))
+
+
+@receiver(post_save, sender=Campervan)
+def generate_image_derivatives(sender, instance, **kwargs):
+    """
+    Let the image backend prepare resized copies of a new image.
+    """
+    name = image_name(instance.image)
+    if name:
+        transaction.on_commit(
+            lambda: get_image_backend().schedule_derivatives(name)
+        )
@@ -0,0 +1,36 @@
+from django import template
+from django.utils.html import format_html
+
+from core.images import IMAGE_WIDTHS
+
+register = template.Library()
+
+
+@register.simple_tag
+def campervan_image(
+    campervan,
+    sizes="(max-width: 576px) 100vw, 300px",
+    css_class="img-fluid",
+    width=300,
+    style="",
+    image_format="auto",
+):
+    """
+    Responsive, lazily loaded <img> for a campervan: resized Cloudinary
+    URLs in srcset, the smallest width that covers `width` as src.
+    """
+    if not campervan.image:
+        return ""
+    src_width = next(
+        (w for w in IMAGE_WIDTHS if w >= width), IMAGE_WIDTHS[-1]
+    )
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}"'
+        ' style="{}" loading="lazy" decoding="async">',
+        campervan.image_url(src_width, image_format),
+        campervan.image_srcset(image_format=image_format),
+        sizes,
+        campervan.name,
+        css_class,
+        style,
+    )
@@ -1,3 +1,542 @@
-from django.test import TestCase
+import argparse
+import base64
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from booking.models import Booking
+from core.facets import get_facet_index
+from core.forms import LocalImageCampervanForm
+from core.images import Image, get_image_backend
+from core.management.commands.loadtest import parse_mix
+from core.models import Campervan
+from core.pagination import decode_cursor
 
-# Create your tests here.
+
+class FacetIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name, brand, model, capacity in [
+            ("Van A", "VW", "California", 4),
+            ("Van B", "vw", "Grand California", 2),
+            ("Van C", "Ford", "Nugget", 4),
+            ("Van D", None, None, 6),
+        ]:
+            Campervan.objects.create(
+                name=name,
+                description="Facet test campervan.",
+                price_per_day=100.00,
+                image="test_image.jpg",
+                capacity=capacity,
+                location="Test Location",
+                brand=brand,
+                model=model,
+            )
+
+    def test_facet_index_contents(self):
+        """Test that brands and models are mapped case-insensitively."""
+        index = get_facet_index()
+        self.assertEqual(index["brands"], ["Ford", "VW", "vw"])
+        self.assertEqual(
+            index["models"], ["California", "Grand California", "Nugget"]
+        )
+        self.assertEqual(
+            index["brand_models"]["VW"], ["California", "Grand California"]
+        )
+        self.assertEqual(index["model_brands"]["Nugget"], ["Ford"])
+        self.assertEqual(index["capacities"], {2: 1, 4: 2, 6: 1})
+        self.assertEqual(len(index["campers"]), 4)
+
+    def test_facet_index_is_cached(self):
+        """Test that the index is built once and then served from cache."""
+        with self.assertNumQueries(1):
+            get_facet_index()
+        with self.assertNumQueries(0):
+            get_facet_index()
+
+    def test_facet_index_invalidated_on_save_and_delete(self):
+        """Test that campervan changes rebuild the index."""
+        get_facet_index()
+        van = Campervan.objects.get(name="Van C")
+        van.brand = "Hymer"
+        van.save()
+        self.assertIn("Hymer", get_facet_index()["brands"])
+
+        van.delete()
+        self.assertNotIn("Hymer", get_facet_index()["brands"])
+
+    def test_facets_endpoint(self):
+        """Test that the filter data is served as compressed JSON."""
+        url = reverse("campervan_facets")
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data["brands"], ["Ford", "VW", "vw"])
+        self.assertEqual(len(data["campers"]), 4)
+
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        for encoding in ("gzip", "br"):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            self.assertEqual(response["Content-Encoding"], encoding)
+            self.assertTrue(response["ETag"].startswith("W/"))
+            response = self.client.get(
+                url,
+                HTTP_ACCEPT_ENCODING=encoding,
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+            self.assertEqual(response.status_code, 304)
+
+        # A fleet change gives the payload a new ETag.
+        Campervan.objects.filter(name="Van C").first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["campers"]), 3)
+
+    def test_campervan_list_does_not_inline_facets(self):
+        """Test that the listing HTML no longer embeds the fleet data."""
+        response = self.client.get(reverse("campervan_list"))
+        self.assertNotContains(response, "JSON.parse")
+        self.assertContains(response, reverse("campervan_facets"))
+
+    def test_campervan_list_query_count_is_constant(self):
+        """Test that the listing doesn't query once per brand or model."""
+        get_facet_index()
+        with self.assertNumQueries(2):
+            self.client.get(reverse("campervan_list"), {"brand": "VW"})
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="cacheuser", password="password123"
+        )
+        self.campervan = Campervan.objects.create(
+            name="Cached Van",
+            description="Cache test campervan.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+            brand="VW",
+            model="California",
+        )
+
+    def date_params(self):
+        start = date.today() + timedelta(days=10)
+        return {
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": (start + timedelta(days=5)).strftime("%Y-%m-%d"),
+        }
+
+    def book(self, params):
+        return Booking.objects.create(
+            user=self.user,
+            campervan=self.campervan,
+            start_date=params["start_date"],
+            end_date=params["end_date"],
+            total_price=500.00,
+        )
+
+    def test_static_pages_are_cached(self):
+        """Test that anonymous renders of the static pages are reused."""
+        for name in ("about", "faq"):
+            first = self.client.get(reverse(name))
+            with patch("core.views.render") as render:
+                second = self.client.get(reverse(name))
+            render.assert_not_called()
+            self.assertEqual(first.content, second.content)
+
+    def test_logged_in_render_is_not_served_to_anonymous(self):
+        """Test that a logged-in user's page never reaches the cache."""
+        self.client.login(username="cacheuser", password="password123")
+        for name in ("about", "faq"):
+            self.assertContains(
+                self.client.get(reverse(name)), "cacheuser Profile"
+            )
+        self.client.logout()
+        for name in ("about", "faq"):
+            response = self.client.get(reverse(name))
+            self.assertNotContains(response, "cacheuser")
+            self.assertContains(response, "Login")
+
+    def test_contact_page_is_not_cached(self):
+        """Test that every contact visitor gets their own CSRF cookie."""
+        for _ in range(2):
+            client = Client(enforce_csrf_checks=True)
+            response = client.get(reverse("contact"))
+            self.assertIn("csrftoken", response.cookies)
+
+    def test_campervan_list_results_are_cached(self):
+        """Test that repeated listings skip the campervan queries."""
+        url = reverse("campervan_list")
+        self.client.get(url, {"q": "cached"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "cached"})
+        self.assertContains(response, "Cached Van")
+
+    def test_campervan_change_invalidates_listing(self):
+        """Test that saving a campervan invalidates cached listings."""
+        url = reverse("campervan_list")
+        self.client.get(url)
+        self.campervan.name = "Renamed Van"
+        self.campervan.save()
+        self.assertContains(self.client.get(url), "Renamed Van")
+
+    @override_settings(SHARED_CACHE=True)
+    def test_booking_change_invalidates_date_filtered_listing(self):
+        """Test that new bookings invalidate date-filtered listings."""
+        url = reverse("campervan_list")
+        params = self.date_params()
+        self.assertContains(self.client.get(url, params), "Cached Van")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(params)
+        self.assertNotContains(self.client.get(url, params), "Cached Van")
+
+        # Listings without a date filter keep their cached results.
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.user,
+                campervan=self.campervan,
+                start_date=date.today() + timedelta(days=15),
+                end_date=date.today() + timedelta(days=17),
+                total_price=200.00,
+            )
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_date_filtered_listing_not_cached_per_process(self):
+        """Test that without a shared cache, date-filtered listings
+        see bookings made by another process (no version bump here)."""
+        url = reverse("campervan_list")
+        params = self.date_params()
+        self.assertContains(self.client.get(url, params), "Cached Van")
+        # Not committed here, so this process never bumps the version.
+        self.book(params)
+        self.assertNotContains(self.client.get(url, params), "Cached Van")
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Equal prices make the id tie-breaker matter.
+        for i in range(12):
+            Campervan.objects.create(
+                name=f"Paged Van {i:02d}",
+                description="Pagination test campervan.",
+                price_per_day=100 + (i // 3) * 10,
+                image="test_image.jpg",
+                capacity=2 + i % 4,
+                location="Test Location",
+            )
+        self.url = reverse("campervan_list")
+
+    def names(self, response):
+        return [c.name for c in response.context["campervans"]]
+
+    def test_cursor_walks_every_campervan_once(self):
+        """Test that next/previous cursors cover the listing in order."""
+        response = self.client.get(self.url)
+        seen = self.names(response)
+        pages = [response.context["campervans"]]
+        while pages[-1].has_next():
+            response = self.client.get(
+                self.url, {"cursor": pages[-1].next_cursor}
+            )
+            seen += self.names(response)
+            pages.append(response.context["campervans"])
+        self.assertEqual(seen, [f"Paged Van {i:02d}" for i in range(12)])
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0].has_previous())
+
+        response = self.client.get(
+            self.url, {"cursor": pages[-1].previous_cursor}
+        )
+        self.assertEqual(
+            self.names(response), [c.name for c in pages[1]]
+        )
+
+    def test_deep_pages_skip_the_count(self):
+        """Test that only the first page counts the listing."""
+        response = self.client.get(self.url, {"capacity": "3"})
+        cursor = response.context["campervans"].next_cursor
+        self.assertEqual(response.context["campervans"].approximate_count, 9)
+        # Facet index and count are cached: one keyset query.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, {"capacity": "3", "cursor": cursor}
+            )
+        self.assertContains(response, "capacity=3&amp;cursor=")
+
+    def test_invalid_cursor_starts_over(self):
+        """Test that tampered cursors fall back to the first page."""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(
+            self.names(response), [f"Paged Van {i:02d}" for i in range(5)]
+        )
+
+    def test_crafted_cursors_start_over(self):
+        """Test that well-formed but out-of-range cursors are rejected."""
+        for raw in (
+            '["Infinity", 1, "n"]',
+            '["NaN", 1, "n"]',
+            '["10", 1e400, "n"]',
+            '["10", 1.5, "p"]',
+            '["10", true, "n"]',
+        ):
+            token = base64.urlsafe_b64encode(raw.encode()).decode()
+            self.assertIsNone(decode_cursor(token))
+            response = self.client.get(self.url, {"cursor": token})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                self.names(response),
+                [f"Paged Van {i:02d}" for i in range(5)],
+            )
+
+
+class CampervanImageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campervan = Campervan.objects.create(
+            name="Image Van",
+            description="Image test campervan.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+        )
+
+    def test_image_url_transformations(self):
+        """Test that URLs are resized with automatic quality/format."""
+        url = self.campervan.image_url(480)
+        self.assertTrue(url.startswith("https://"))
+        self.assertIn("w_480", url)
+        self.assertIn("q_auto", url)
+        self.assertIn("f_auto", url)
+        self.assertIn("f_avif", self.campervan.image_url(480, "avif"))
+        self.assertEqual(self.campervan.image_srcset().count("w,"), 3)
+
+    def test_listing_renders_responsive_images(self):
+        """Test that the listing uses srcset and lazy loading."""
+        response = self.client.get(reverse("campervan_list"))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, "srcset=")
+        self.assertContains(response, "w_320")
+        self.assertNotContains(response, "/image/upload/test_image.jpg")
+
+
+class LocalImageBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(
+            IMAGE_BACKEND="core.images.LocalImageBackend",
+            MEDIA_ROOT=self.media_root,
+            IMAGE_DERIVATIVES_ASYNC=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, name="van.png"):
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 800), "green").save(buffer, "PNG")
+        return get_image_backend().save(
+            SimpleUploadedFile(name, buffer.getvalue())
+        )
+
+    def test_derivatives_generated_after_save(self):
+        """Test that saving a campervan writes resized JPEG/WebP copies."""
+        name = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            campervan = Campervan.objects.create(
+                name="Local Van",
+                description="Local image test campervan.",
+                price_per_day=100.00,
+                image=name,
+                capacity=4,
+                location="Test Location",
+            )
+        derived = os.path.join(self.media_root, "campervans", "derived")
+        self.assertEqual(len(os.listdir(derived)), 8)
+        with Image.open(os.path.join(derived, "van-320.webp")) as image:
+            self.assertEqual(image.size, (320, 213))
+
+        campervan.refresh_from_db()
+        self.assertEqual(
+            campervan.image_url(300), "/media/campervans/derived/van-320.webp"
+        )
+        self.assertEqual(
+            campervan.image_url(500, "jpg"),
+            "/media/campervans/derived/van-640.jpg",
+        )
+        self.assertEqual(campervan.image_url(), "/media/campervans/van.png")
+
+    def test_original_served_until_derivatives_exist(self):
+        """Test that new uploads don't link to missing derivatives."""
+        name = self.upload()
+        backend = get_image_backend()
+        self.assertEqual(backend.url(name, 300), "/media/campervans/van.png")
+        backend.generate_derivatives(name)
+        self.assertEqual(
+            backend.url(name, 300), "/media/campervans/derived/van-320.webp"
+        )
+
+    def test_admin_form_writes_upload_on_save(self):
+        """Test that rejected forms don't leave uploaded files behind."""
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 800), "green").save(buffer, "PNG")
+        data = {
+            "name": "Form Van",
+            "description": "Local image form test campervan.",
+            "price_per_day": "100.00",
+            "capacity": 4,
+            "location": "Test Location",
+            "availability_status": True,
+        }
+        uploads = os.path.join(self.media_root, "campervans")
+
+        form = LocalImageCampervanForm(
+            dict(data, capacity=""),
+            {"image": SimpleUploadedFile("form.png", buffer.getvalue())},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertFalse(os.path.exists(uploads))
+
+        form = LocalImageCampervanForm(
+            data,
+            {"image": SimpleUploadedFile("form.png", buffer.getvalue())},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(os.path.exists(uploads))
+        campervan = form.save()
+        self.assertEqual(campervan.image_url(), "/media/campervans/form.png")
+        self.assertTrue(os.path.exists(os.path.join(uploads, "form.png")))
+
+    def test_generate_image_derivatives_command(self):
+        """Test that the command backfills existing images."""
+        name = self.upload("old.png")
+        Campervan.objects.bulk_create(
+            [
+                Campervan(
+                    name="Old Van",
+                    description="Imported before the local backend.",
+                    price_per_day=100.00,
+                    image=name,
+                    capacity=4,
+                    location="Test Location",
+                )
+            ]
+        )
+        out = StringIO()
+        call_command("generate_image_derivatives", stdout=out)
+        self.assertIn("Wrote 8 image file(s).", out.getvalue())
+
+
+@override_settings(
+    STATICFILES_FINDERS=[
+        "django.contrib.staticfiles.finders.FileSystemFinder"
+    ],
+    STATICFILES_STORAGE="core.storage.StaticFilesStorage",
+)
+class StaticFilesStorageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, True)
+
+    def test_uncollected_files_raise(self):
+        """Test that assets missing from the manifest aren't served
+        under their unhashed name."""
+        with override_settings(STATIC_ROOT=self.static_root):
+            with self.assertRaises(ValueError):
+                staticfiles_storage.stored_name("css/style.css")
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        """Test that assets are hashed, pre-compressed and looked up."""
+        with override_settings(STATIC_ROOT=self.static_root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name("css/style.css")
+            response = self.client.get(reverse("about"))
+
+        self.assertRegex(hashed, r"^css/style\.[0-9a-f]{12}\.css$")
+        for suffix in ("", ".gz", ".br"):
+            self.assertTrue(
+                os.path.exists(
+                    os.path.join(self.static_root, hashed + suffix)
+                )
+            )
+        self.assertContains(response, f"/static/{hashed}")
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, True)
+
+    def loadtest(self, *args):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            *args,
+            requests=20,
+            concurrency=2,
+            campervans=3,
+            bookings=5,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_smoke_run_and_compare(self):
+        """Test a short run without server errors, saved and compared."""
+        output = os.path.join(self.tmpdir, "baseline.json")
+        self.loadtest("--output", output)
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(results["overall"]["requests"], 20)
+        self.assertEqual(results["overall"]["errors"], 0)
+        for result in results["endpoints"].values():
+            self.assertFalse(
+                [code for code in result["status_codes"] if int(code) >= 500]
+            )
+
+        report = self.loadtest("--compare", output)
+        self.assertIn("Compared with the baseline run:", report)
+        self.assertRegex(report, r"overall\s+req/s [+-]\d")
+        # The run used its own database.
+        self.assertFalse(Campervan.objects.exists())
+
+    def test_parse_mix(self):
+        """Test --mix parsing and its errors."""
+        self.assertEqual(
+            parse_mix("campervan_list=3, my_bookings=1"),
+            {"campervan_list": 3, "my_bookings": 1},
+        )
+        with self.assertRaisesMessage(
+            argparse.ArgumentTypeError, "Unknown scenario 'checkout'"
+        ):
+            parse_mix("checkout=1")
+        with self.assertRaisesMessage(
+            argparse.ArgumentTypeError, "Invalid weight for my_bookings"
+        ):
+            parse_mix("my_bookings=many")
+        with self.assertRaises(CommandError):
+            self.loadtest("--mix", "checkout=1")
@@ -9,6 +9,11 @@ urlpatterns = [
     path("users/", include("users.urls")),
     path("booking/", include("booking.urls")),
     path("campervans/", views.campervan_list, name="campervan_list"),
+    path(
+        "campervans/facets.json",
+        views.campervan_facets,
+        name="campervan_facets",
+    ),
     path(
         "check-availability/",
         views.check_availability,
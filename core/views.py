@@ -1,20 +1,31 @@
-import json
 from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.core.mail import send_mail
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.db.models import Exists, OuterRef
 import datetime
 from .models import Campervan  # Import Campervan
+from booking.availability import ais_available
 from booking.models import Booking  # Import Booking
+from search.engine import search_campervans
 from .forms import ContactForm
+from .caching import cache_anonymous_page, listing_cache_key
+from .pagination import approximate_count, cursor_paginate
+from .compression import compress_content
+from .facets import get_facet_index, get_facet_payload
 
 
 # Create your views here.
 
 
+@cache_anonymous_page(settings.CACHE_PAGE_TIMEOUT)
 def about(request):
     """View to display the About page."""
     return render(request, "core/about.html")
@@ -67,6 +78,7 @@ def contact(request):
     return render(request, "core/contact.html", {"form": form})
 
 
+@cache_anonymous_page(settings.CACHE_PAGE_TIMEOUT)
 def faq(request):
     """Display the FAQ page."""
     return render(request, "core/faq.html")
@@ -81,102 +93,109 @@ def campervan_list(request):
     start_date = request.GET.get("start_date", "").strip()
     end_date = request.GET.get("end_date", "").strip()
 
-    campervans = Campervan.objects.all()
-
-    # Apply filters to the main QuerySet.
-    if query:
-        campervans = campervans.filter(
-            Q(name__icontains=query) | Q(description__icontains=query)
-        )
-    if selected_brand:
-        campervans = campervans.filter(brand__iexact=selected_brand)
-    if selected_model:
-        campervans = campervans.filter(model__iexact=selected_model)
-    if selected_capacity.isdigit():
-        campervans = campervans.filter(capacity__gte=int(selected_capacity))
-    if max_price.isdigit():
-        campervans = campervans.filter(price_per_day__lte=int(max_price))
+    # The results fragment is cached per query string until the fleet
+    # (or, for date-filtered listings, the bookings) change. Bookings
+    # also change in the webhook and expiry workers, so date-filtered
+    # listings are only cached when every process shares the cache.
+    versions = ["campervans"]
     if start_date and end_date:
-        unavailable_ids = Booking.objects.filter(
-            start_date__lt=end_date, end_date__gt=start_date
-        ).values_list("campervan_id", flat=True)
-        campervans = campervans.exclude(id__in=unavailable_ids)
-
-    # Build full dropdown lists for filtering from the full dataset
-    brands_list = list(
-        Campervan.objects.exclude(brand__isnull=True)
-        .values_list("brand", flat=True)
-        .distinct()
-        .order_by("brand")
-    )
-    models_list = list(
-        Campervan.objects.exclude(model__isnull=True)
-        .values_list("model", flat=True)
-        .distinct()
-        .order_by("model")
-    )
+        versions.append("bookings")
+    cacheable = settings.SHARED_CACHE or "bookings" not in versions
+    cache_key = listing_cache_key("campervan_list", request, versions)
+    results_html = cache.get(cache_key) if cacheable else None
+    if results_html is None:
+        campervans = Campervan.objects.all()
+
+        # Apply filters to the main QuerySet.
+        if query:
+            # Full-text search, best matches first
+            campervans = search_campervans(campervans, query).order_by(
+                "-search_rank", "pk"
+            )
+        if selected_brand:
+            campervans = campervans.filter(brand__iexact=selected_brand)
+        if selected_model:
+            campervans = campervans.filter(model__iexact=selected_model)
+        if selected_capacity.isdigit():
+            campervans = campervans.filter(
+                capacity__gte=int(selected_capacity)
+            )
+        if max_price.isdigit():
+            campervans = campervans.filter(price_per_day__lte=int(max_price))
+        if start_date and end_date:
+            try:
+                start_date_dt = datetime.datetime.strptime(
+                    start_date, "%Y-%m-%d"
+                ).date()
+                end_date_dt = datetime.datetime.strptime(
+                    end_date, "%Y-%m-%d"
+                ).date()
+            except ValueError:
+                start_date_dt = end_date_dt = None
+            if start_date_dt and end_date_dt:
+                campervans = campervans.exclude(
+                    Exists(
+                        Booking.objects.overlapping(
+                            OuterRef("pk"), start_date_dt, end_date_dt
+                        )
+                    )
+                )
+
+        # Ranked search results keep numbered pages. Everything else is
+        # paged by (price_per_day, id) cursors, with the count cached
+        # separately so deep pages cost the same as the first.
+        if query:
+            paginator = Paginator(campervans, 5)
+            page = request.GET.get("page", 1)
+            try:
+                campervans = paginator.page(page)
+            except PageNotAnInteger:
+                campervans = paginator.page(1)
+            except EmptyPage:
+                campervans = paginator.page(paginator.num_pages)
+        else:
+            if cacheable:
+                count = approximate_count(
+                    campervans,
+                    listing_cache_key(
+                        "campervan_count",
+                        request,
+                        versions,
+                        ignore=("page", "cursor"),
+                    ),
+                )
+            else:
+                count = campervans.count()
+            campervans = cursor_paginate(
+                campervans, request.GET.get("cursor"), 5, count
+            )
 
-    # Build mappings for dynamic filtering.
-    brand_models_mapping = {}
-    for brand in (
-        Campervan.objects.exclude(brand__isnull=True)
-        .values_list("brand", flat=True)
-        .distinct()
-    ):
-        brand_models = list(
-            Campervan.objects.filter(brand__iexact=brand)
-            .exclude(model__isnull=True)
-            .values_list("model", flat=True)
-            .distinct()
-            .order_by("model")
-        )
-        brand_models_mapping[brand] = brand_models
-
-    model_brands_mapping = {}
-    for model in (
-        Campervan.objects.exclude(model__isnull=True)
-        .values_list("model", flat=True)
-        .distinct()
-    ):
-        model_brands = list(
-            Campervan.objects.filter(model__iexact=model)
-            .exclude(brand__isnull=True)
-            .values_list("brand", flat=True)
-            .distinct()
-            .order_by("brand")
-        )
-        model_brands_mapping[model] = model_brands
+        # Filters carried over into the pagination links
+        filters = request.GET.copy()
+        filters.pop("page", None)
+        filters.pop("cursor", None)
 
-    # Build full dataset for client‑side filtering
-    # (for capacity and for rebuilding full lists)
-    campers_data = list(
-        Campervan.objects.all().values("brand", "model", "capacity")
-    )
+        results_html = render_to_string(
+            "core/campervan_results.html",
+            {"campervans": campervans, "filters": filters.urlencode()},
+        )
+        if cacheable:
+            cache.set(cache_key, results_html, settings.CACHE_PAGE_TIMEOUT)
 
-    # Serialize JSON strings.
-    brand_models_json = json.dumps(brand_models_mapping)
-    model_brands_json = json.dumps(model_brands_mapping)
-    brands_json = json.dumps(brands_list)
-    models_json = json.dumps(models_list)
-    campers_data_json = json.dumps(campers_data)
+    # Dropdown lists come from the cached facet index instead of
+    # per-brand/per-model queries. The client-side filter data is
+    # loaded lazily from campervan_facets.
+    facets = get_facet_index()
+    brands_list = facets["brands"]
+    models_list = facets["models"]
 
     capacity_range = range(1, 11)
 
-    # Pagination
-    paginator = Paginator(campervans, 5)
-    page = request.GET.get("page", 1)
-    try:
-        campervans = paginator.page(page)
-    except PageNotAnInteger:
-        campervans = paginator.page(1)
-    except EmptyPage:
-        campervans = paginator.page(paginator.num_pages)
-
     return render(
         request,
         "core/campervan_list.html",
         {
-            "campervans": campervans,
+            "results_html": mark_safe(results_html),
             "query": query,
             "brands": brands_list,
             "models": models_list,
@@ -187,24 +206,37 @@ def campervan_list(request):
             "capacity_range": capacity_range,
             "start_date": start_date,
             "end_date": end_date,
-            "brand_models_json": brand_models_json,
-            "model_brands_json": model_brands_json,
-            "brands_json": brands_json,
-            "models_json": models_json,
-            "campers_data_json": campers_data_json,
         },
     )
 
 
-def check_availability(request):
-    """View to check campervan availability for selected dates."""
+def _facets_etag(request):
+    return get_facet_payload()[1]
+
+
+@cache_control(public=True, max_age=settings.CACHE_TIMEOUT)
+@compress_content
+@condition(etag_func=_facets_etag)
+def campervan_facets(request):
+    """
+    Brand/model/capacity data for the campervan_list filters.
+    """
+    body, etag = get_facet_payload()
+    return HttpResponse(body, content_type="application/json")
+
+
+async def check_availability(request):
+    """
+    View to check campervan availability for selected dates.
+    Async so the datepicker fetches don't hold a worker under ASGI.
+    """
     campervan_id = request.GET.get("campervan_id")
     start_date = request.GET.get("start_date")
     end_date = request.GET.get("end_date")
 
     try:
         # Check if start_date < end_date
-        campervan = Campervan.objects.get(id=campervan_id)
+        campervan_id = int(campervan_id)
         start_date_dt = datetime.datetime.strptime(
             start_date, "%Y-%m-%d"
         ).date()
@@ -216,15 +248,13 @@ def check_availability(request):
                 status=400,
             )
 
-        overlapping_bookings = Booking.objects.filter(
-            campervan=campervan,
-            start_date__lt=end_date_dt,
-            end_date__gt=start_date_dt,
+        # Answered from the cached occupancy bitmap
+        is_available = await ais_available(
+            campervan_id, start_date_dt, end_date_dt
         )
-        is_available = not overlapping_bookings.exists()
         return JsonResponse({"is_available": is_available})
 
-    except (Campervan.DoesNotExist, ValueError):
+    except (Campervan.DoesNotExist, TypeError, ValueError):
         # Handle unexpected errors
         return JsonResponse(
             {"error": "An unexcepted error occured"}, status=400
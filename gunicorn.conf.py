@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for the web process.
+
+SERVER_PROFILE selects how requests are served:
+- "wsgi" (default): sync workers running campervan_rental.wsgi, one
+  request per worker at a time. Booking status is polled.
+- "asgi": uvicorn workers running campervan_rental.asgi, so the async
+  availability and status views share one event loop per worker.
+  With a shared cache (CACHE_BACKEND), booking status is also pushed
+  over server-sent events. Persistent database connections are
+  turned off (one would be held per thread-pool thread) unless
+  DB_POOL_MODE=pgbouncer.
+"""
+
+import multiprocessing
+import os
+
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "wsgi")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+
+if SERVER_PROFILE == "asgi":
+    wsgi_app = "campervan_rental.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    # Each worker multiplexes requests, so one per core is enough.
+    default_workers = multiprocessing.cpu_count()
+else:
+    wsgi_app = "campervan_rental.wsgi:application"
+    worker_class = "sync"
+    default_workers = multiprocessing.cpu_count() * 2 + 1
+
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
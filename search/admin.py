@@ -1,3 +1,15 @@
 from django.contrib import admin
+from .models import SearchDocument, SearchTerm
 
-# Register your models here.
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ("campervan", "name", "brand", "model", "location")
+    search_fields = ("name", "brand", "model", "location")
+
+
+@admin.register(SearchTerm)
+class SearchTermAdmin(admin.ModelAdmin):
+    list_display = ("normalized", "label", "kind", "campervans")
+    list_filter = ("kind",)
+    search_fields = ("normalized", "label")
@@ -0,0 +1,81 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# bm25() weights for name, brand, model, location and description,
+# in the same order as the PostgreSQL setweight() classes A to D
+FTS5_WEIGHTS = "10.0, 5.0, 5.0, 2.0, 1.0"
+
+
+def search_terms(query):
+    """
+    Words of a search query, lower-cased. Anything that isn't a word
+    character is dropped, so the terms are safe to splice into
+    tsquery / FTS5 match expressions.
+    """
+    return re.findall(r"\w+", query.lower())
+
+
+def search_campervans(campervans, query):
+    """
+    Filter a Campervan queryset to full-text matches for query and
+    annotate search_rank (higher is better). Every word must match,
+    as a prefix, one of name, brand, model, location or description.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return campervans.none().annotate(search_rank=Value(0.0))
+
+    vendor = connections[campervans.db].vendor
+    outer_pk = f'"{campervans.model._meta.db_table}"."id"'
+
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return campervans.filter(
+            pk__in=RawSQL(
+                "SELECT campervan_id FROM search_searchdocument "
+                "WHERE search_vector @@ to_tsquery('english', %s)",
+                [tsquery],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                "SELECT ts_rank(search_vector, to_tsquery('english', %s)) "
+                "FROM search_searchdocument "
+                f"WHERE campervan_id = {outer_pk}",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return campervans.filter(
+            pk__in=RawSQL(
+                "SELECT rowid FROM search_searchdocument_fts "
+                "WHERE search_searchdocument_fts MATCH %s",
+                [match],
+            )
+        ).annotate(
+            # bm25() is lower for better matches
+            search_rank=RawSQL(
+                "SELECT -bm25(search_searchdocument_fts, "
+                f"{FTS5_WEIGHTS}) FROM search_searchdocument_fts "
+                "WHERE search_searchdocument_fts MATCH %s "
+                f"AND rowid = {outer_pk}",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+    # No full-text index on other databases: match every word somewhere.
+    for term in terms:
+        campervans = campervans.filter(
+            Q(search_document__name__icontains=term)
+            | Q(search_document__brand__icontains=term)
+            | Q(search_document__model__icontains=term)
+            | Q(search_document__location__icontains=term)
+            | Q(search_document__description__icontains=term)
+        )
+    return campervans.annotate(search_rank=Value(0.0))
@@ -0,0 +1,35 @@
+from django.db import connection
+
+from core.models import Campervan
+from .models import SearchDocument
+
+
+def index_campervan(campervan):
+    """
+    Create or refresh the search document of one campervan.
+    """
+    SearchDocument.objects.update_or_create(
+        campervan=campervan, defaults=SearchDocument.fields_for(campervan)
+    )
+
+
+def rebuild_index(batch_size=500):
+    """
+    Recreate every search document from the campervans table.
+    Returns the number of documents indexed.
+    """
+    SearchDocument.objects.all().delete()
+    documents = [
+        SearchDocument(
+            campervan=campervan, **SearchDocument.fields_for(campervan)
+        )
+        for campervan in Campervan.objects.iterator(chunk_size=batch_size)
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO search_searchdocument_fts"
+                "(search_searchdocument_fts) VALUES ('rebuild')"
+            )
+    return len(documents)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import rebuild_index
+from search.suggest import rebuild_terms
+
+
+class Command(BaseCommand):
+    help = "Rebuild the campervan search index and autocomplete terms."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Campervans read and written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(f"Indexed {count} campervan(s).")
+        terms = rebuild_terms()
+        self.stdout.write(f"Rebuilt {terms} autocomplete term(s).")
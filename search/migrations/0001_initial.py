@@ -0,0 +1,28 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0002_campervan_brand_campervan_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('campervan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.campervan')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('brand', models.CharField(blank=True, max_length=50)),
+                ('model', models.CharField(blank=True, max_length=50)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,110 @@
+from django.db import migrations
+
+FTS5_COLUMNS = "name, brand, model, location, description"
+
+
+def create_fulltext_index(apps, schema_editor):
+    """
+    PostgreSQL: weighted tsvector column with a GIN index.
+    SQLite: external-content FTS5 table kept in sync by triggers.
+    Other databases fall back to icontains (see search.engine).
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE search_searchdocument "
+            "ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', "
+            "coalesce(brand, '') || ' ' || coalesce(model, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(location, '')), 'C') || "  # noqa
+            "setweight(to_tsvector('english', coalesce(description, '')), 'D')"  # noqa
+            ") STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX search_document_vector_idx "
+            "ON search_searchdocument USING gin (search_vector)"
+        )
+    elif vendor == "sqlite":
+        new = ", ".join(f"new.{c}" for c in FTS5_COLUMNS.split(", "))
+        old = ", ".join(f"old.{c}" for c in FTS5_COLUMNS.split(", "))
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5("
+            f"{FTS5_COLUMNS}, content='search_searchdocument', "
+            "content_rowid='campervan_id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER search_searchdocument_ai "
+            "AFTER INSERT ON search_searchdocument BEGIN "
+            f"INSERT INTO search_searchdocument_fts(rowid, {FTS5_COLUMNS}) "
+            f"VALUES (new.campervan_id, {new}); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER search_searchdocument_ad "
+            "AFTER DELETE ON search_searchdocument BEGIN "
+            "INSERT INTO search_searchdocument_fts"
+            f"(search_searchdocument_fts, rowid, {FTS5_COLUMNS}) "
+            f"VALUES ('delete', old.campervan_id, {old}); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER search_searchdocument_au "
+            "AFTER UPDATE ON search_searchdocument BEGIN "
+            "INSERT INTO search_searchdocument_fts"
+            f"(search_searchdocument_fts, rowid, {FTS5_COLUMNS}) "
+            f"VALUES ('delete', old.campervan_id, {old}); "
+            f"INSERT INTO search_searchdocument_fts(rowid, {FTS5_COLUMNS}) "
+            f"VALUES (new.campervan_id, {new}); END"
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "DROP INDEX IF EXISTS search_document_vector_idx"
+        )
+        schema_editor.execute(
+            "ALTER TABLE search_searchdocument "
+            "DROP COLUMN IF EXISTS search_vector"
+        )
+    elif vendor == "sqlite":
+        for trigger in ("ai", "ad", "au"):
+            schema_editor.execute(
+                f"DROP TRIGGER IF EXISTS search_searchdocument_{trigger}"
+            )
+        schema_editor.execute(
+            "DROP TABLE IF EXISTS search_searchdocument_fts"
+        )
+
+
+def index_existing_campervans(apps, schema_editor):
+    Campervan = apps.get_model("core", "Campervan")
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    SearchDocument.objects.bulk_create(
+        [
+            SearchDocument(
+                campervan=campervan,
+                name=campervan.name or "",
+                brand=campervan.brand or "",
+                model=campervan.model or "",
+                location=campervan.location or "",
+                description=campervan.description or "",
+            )
+            for campervan in Campervan.objects.iterator()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(
+            index_existing_campervans, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    PostgreSQL only: trigram index for LIKE 'prefix%' and fuzzy matches.
+    SQLite uses a range scan on search_term_prefix_idx.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX search_term_trgm_idx "
+        "ON search_searchterm USING gin (normalized gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS search_term_trgm_idx")
+
+
+def build_existing_terms(apps, schema_editor):
+    from search.suggest import SUGGEST_FIELDS, build_terms
+
+    Campervan = apps.get_model("core", "Campervan")
+    SearchTerm = apps.get_model("search", "SearchTerm")
+    SearchTerm.objects.bulk_create(
+        SearchTerm(
+            kind=kind, label=label, normalized=normalized, campervans=count
+        )
+        for kind, label, normalized, count in build_terms(
+            Campervan.objects.values_list(*SUGGEST_FIELDS)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('name', 'Name'), ('brand', 'Brand'), ('model', 'Model'), ('location', 'Location')], max_length=10)),
+                ('campervans', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['normalized'], name='search_term_prefix_idx')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(build_existing_terms, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,61 @@
 from django.db import models
+from core.models import Campervan
 
-# Create your models here.
+
+# Searchable copy of a campervan's text, kept in sync on Campervan save.
+# The full-text index over it is created per database in the migrations:
+# a weighted tsvector column with a GIN index on PostgreSQL and an FTS5
+# table (search_searchdocument_fts) on SQLite.
+class SearchDocument(models.Model):
+    campervan = models.OneToOneField(
+        Campervan,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    name = models.CharField(max_length=100, blank=True)
+    brand = models.CharField(max_length=50, blank=True)
+    model = models.CharField(max_length=50, blank=True)
+    location = models.CharField(max_length=100, blank=True)
+    description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for {self.name}"
+
+    @staticmethod
+    def fields_for(campervan):
+        return {
+            "name": campervan.name or "",
+            "brand": campervan.brand or "",
+            "model": campervan.model or "",
+            "location": campervan.location or "",
+            "description": campervan.description or "",
+        }
+
+
+# Autocomplete entries: one row per word start of a campervan's name,
+# brand, model or location, lower-cased so a prefix is a range scan
+# (plus a trigram index on PostgreSQL). Rebuilt by search.suggest.
+class SearchTerm(models.Model):
+    KIND_CHOICES = [
+        ("name", "Name"),
+        ("brand", "Brand"),
+        ("model", "Model"),
+        ("location", "Location"),
+    ]
+
+    normalized = models.CharField(max_length=100)
+    label = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    campervans = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["normalized"], name="search_term_prefix_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.normalized} -> {self.label} ({self.kind})"
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.models import Campervan
+from .indexing import index_campervan
+from .suggest import SUGGEST_FIELDS, campervan_labels, update_terms
+
+
+def _labels(campervan):
+    return campervan_labels(
+        getattr(campervan, field) for field in SUGGEST_FIELDS
+    )
+
+
+@receiver(post_save, sender=Campervan)
+def update_search_document(sender, instance, **kwargs):
+    """
+    Keep the search index in step with the campervan.
+    Deletes cascade to the document (and the FTS5 table via triggers).
+    """
+    index_campervan(instance)
+
+
+@receiver(pre_save, sender=Campervan)
+def remember_search_labels(sender, instance, **kwargs):
+    """
+    Note the labels the campervan is saved over, so only the terms
+    that change are updated.
+    """
+    row = None
+    if instance.pk:
+        row = (
+            Campervan.objects.filter(pk=instance.pk)
+            .values_list(*SUGGEST_FIELDS)
+            .first()
+        )
+    instance._search_labels = campervan_labels(row) if row else set()
+
+
+@receiver(post_save, sender=Campervan)
+def update_search_terms(sender, instance, **kwargs):
+    """
+    Refresh the autocomplete terms (and their campervan counts).
+    """
+    update_terms(
+        getattr(instance, "_search_labels", set()), _labels(instance)
+    )
+    instance._search_labels = _labels(instance)
+
+
+@receiver(post_delete, sender=Campervan)
+def remove_search_terms(sender, instance, **kwargs):
+    update_terms(_labels(instance), set())
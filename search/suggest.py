@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.db import connections, transaction
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from core.models import Campervan
+from .models import SearchTerm
+
+# Suggestions returned when the request doesn't ask for a number
+SUGGEST_LIMIT = 8
+
+# Hot prefixes are memoised per process for this many seconds
+SUGGEST_CACHE_TTL = 60
+SUGGEST_CACHE_SIZE = 1024
+
+# Campervan fields offered as suggestions, in SearchTerm.kind order
+SUGGEST_FIELDS = ("name", "brand", "model", "location")
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+suggestion_cache = TTLCache(SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL)
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def campervan_labels(values):
+    """
+    {(kind, label)} of one campervan's (name, brand, model, location).
+    """
+    labels = set()
+    for kind, label in zip(SUGGEST_FIELDS, values):
+        label = " ".join((label or "").split())[:100]
+        if label:
+            labels.add((kind, label))
+    return labels
+
+
+def _label_terms(kind, label, count):
+    # One term per word start of the label
+    words = normalize(label).split(" ")
+    return [
+        (kind, label, " ".join(words[i:])[:100], count)
+        for i in range(len(words))
+    ]
+
+
+def _search_terms(terms):
+    return [
+        SearchTerm(
+            kind=kind, label=label, normalized=normalized, campervans=count
+        )
+        for kind, label, normalized, count in terms
+    ]
+
+
+def build_terms(rows):
+    """
+    (kind, label, normalized, campervans) for every word start of the
+    (name, brand, model, location) rows, counting campervans per label.
+    """
+    counts = Counter()
+    for row in rows:
+        counts.update(campervan_labels(row))
+    return [
+        term
+        for (kind, label), count in counts.items()
+        for term in _label_terms(kind, label, count)
+    ]
+
+
+def rebuild_terms():
+    """
+    Replace the autocomplete terms with the current campervans.
+    Used by rebuild_search_index; saves go through update_terms().
+    """
+    terms = build_terms(Campervan.objects.values_list(*SUGGEST_FIELDS))
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        SearchTerm.objects.bulk_create(_search_terms(terms))
+    suggestion_cache.clear()
+    return len(terms)
+
+
+def update_terms(old_labels, new_labels):
+    """
+    Move one campervan from the old to the new {(kind, label)} set:
+    labels it lost count one campervan less (and go once none is
+    left), labels it gained one more. Nothing is written for labels
+    that didn't change.
+    """
+    removed = old_labels - new_labels
+    added = new_labels - old_labels
+    if not removed and not added:
+        return
+    with transaction.atomic():
+        if removed:
+            lost = Q()
+            for kind, label in removed:
+                lost |= Q(kind=kind, label=label)
+            terms = SearchTerm.objects.filter(lost)
+            terms.filter(campervans__lte=1).delete()
+            terms.update(campervans=F("campervans") - 1)
+        new_terms = []
+        for kind, label in added:
+            if not SearchTerm.objects.filter(kind=kind, label=label).update(
+                campervans=F("campervans") + 1
+            ):
+                new_terms += _label_terms(kind, label, 1)
+        SearchTerm.objects.bulk_create(_search_terms(new_terms))
+    suggestion_cache.clear()
+
+
+def _prefix_matches(prefix, vendor):
+    terms = SearchTerm.objects.all()
+    if vendor == "sqlite":
+        # A range scan on the B-tree index; SQLite compares text
+        # bytewise, so U+10FFFF sorts after every continuation.
+        return terms.filter(
+            normalized__gte=prefix, normalized__lt=prefix + "\U0010ffff"
+        )
+    # On PostgreSQL the trigram GIN index serves LIKE 'prefix%'.
+    return terms.filter(normalized__startswith=prefix)
+
+
+def _similar_terms(prefix):
+    # PostgreSQL only: typo-tolerant matches through the trigram index
+    return (
+        SearchTerm.objects.filter(
+            RawSQL(
+                "normalized %% %s", [prefix], output_field=BooleanField()
+            )
+        )
+        .annotate(
+            similarity=RawSQL(
+                "similarity(normalized, %s)",
+                [prefix],
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-similarity")
+    )
+
+
+def suggest(query, limit=SUGGEST_LIMIT):
+    """
+    Up to limit {"label", "kind"} suggestions whose words start with
+    query, most common first. Memoised per prefix in a TTL LRU cache.
+    """
+    prefix = normalize(query)[:100]
+    if not prefix:
+        return []
+    key = (prefix, limit)
+    suggestions = suggestion_cache.get(key)
+    if suggestions is not None:
+        return suggestions
+
+    vendor = connections[SearchTerm.objects.db].vendor
+    suggestions = []
+    seen = set()
+
+    def add(rows):
+        for label, kind in rows:
+            if (label, kind) not in seen and len(suggestions) < limit:
+                seen.add((label, kind))
+                suggestions.append({"label": label, "kind": kind})
+
+    # Several word starts of one label can match the same prefix
+    add(
+        (label, kind)
+        for label, kind, _ in _prefix_matches(prefix, vendor)
+        .values_list("label", "kind", "campervans")
+        .order_by("-campervans", "label", "kind")
+        .distinct()[:limit]
+    )
+    if (
+        vendor == "postgresql"
+        and len(suggestions) < limit
+        and len(prefix) >= 3
+    ):
+        add(_similar_terms(prefix).values_list("label", "kind")[: limit * 4])
+
+    suggestion_cache.set(key, suggestions)
+    return suggestions
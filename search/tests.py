@@ -1,3 +1,194 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from core.models import Campervan
+from search.engine import search_campervans
+from search.models import SearchDocument, SearchTerm
+from search.suggest import suggestion_cache
 
-# Create your tests here.
+
+class SearchEngineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.california = self.create_campervan(
+            "Coastal Cruiser",
+            "Pop-up roof and a full kitchen for surf trips.",
+            brand="Volkswagen",
+            model="California",
+            location="Lisbon",
+        )
+        self.nugget = self.create_campervan(
+            "Mountain Nugget",
+            "Compact camper, great for a California road trip.",
+            brand="Ford",
+            model="Nugget",
+            location="Munich",
+        )
+
+    def create_campervan(self, name, description, **kwargs):
+        return Campervan.objects.create(
+            name=name,
+            description=description,
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            **kwargs,
+        )
+
+    def search(self, query):
+        return list(
+            search_campervans(Campervan.objects.all(), query).order_by(
+                "-search_rank", "pk"
+            )
+        )
+
+    def test_search_matches_all_fields(self):
+        """Test that name, brand, model, location and description match."""
+        self.assertEqual(self.search("cruiser"), [self.california])
+        self.assertEqual(self.search("volkswagen"), [self.california])
+        self.assertEqual(self.search("munich"), [self.nugget])
+        self.assertEqual(self.search("kitchen"), [self.california])
+        # Every word has to match, and words match as prefixes.
+        self.assertEqual(self.search("mount nug"), [self.nugget])
+        self.assertEqual(self.search("mountain lisbon"), [])
+        self.assertEqual(self.search("!!"), [])
+
+    def test_search_ranks_name_and_model_above_description(self):
+        """Test that a model match outranks a description match."""
+        self.assertEqual(
+            self.search("california"), [self.california, self.nugget]
+        )
+
+    def test_index_follows_campervan_changes(self):
+        """Test that saves and deletes keep the index in sync."""
+        self.nugget.location = "Porto"
+        self.nugget.save()
+        self.assertEqual(self.search("porto"), [self.nugget])
+        self.assertEqual(self.search("munich"), [])
+
+        self.nugget.delete()
+        self.assertEqual(self.search("porto"), [])
+        self.assertFalse(SearchDocument.objects.filter(name="Porto").exists())
+
+    def test_rebuild_search_index(self):
+        """Test that the rebuild command restores a lost index."""
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.search("cruiser"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 2 campervan(s).", out.getvalue())
+        self.assertEqual(self.search("cruiser"), [self.california])
+
+    def test_campervan_list_uses_ranked_search(self):
+        """Test that the listing orders search results by rank."""
+        response = self.client.get(
+            reverse("campervan_list"), {"q": "California"}
+        )
+        content = response.content.decode()
+        self.assertLess(
+            content.index("Coastal Cruiser"), content.index("Mountain Nugget")
+        )
+
+
+class SuggestTest(TestCase):
+    def setUp(self):
+        suggestion_cache.clear()
+        for name, brand, model, location in [
+            ("Coastal Cruiser", "Volkswagen", "California", "Lisbon"),
+            ("Cosy Camper", "Volkswagen", "Grand California", "Porto"),
+            ("Mountain Nugget", "Ford", "Nugget", "Munich"),
+        ]:
+            Campervan.objects.create(
+                name=name,
+                description="Suggest test campervan.",
+                price_per_day=100.00,
+                image="test_image.jpg",
+                capacity=4,
+                brand=brand,
+                model=model,
+                location=location,
+            )
+        self.url = reverse("search_suggest")
+
+    def labels(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        return [s["label"] for s in response.json()["suggestions"]]
+
+    def test_prefix_suggestions(self):
+        """Test that word starts match, most common labels first."""
+        self.assertEqual(
+            self.labels("c"),
+            [
+                "California",
+                "Coastal Cruiser",
+                "Cosy Camper",
+                "Grand California",
+            ],
+        )
+        self.assertEqual(
+            self.labels("CALIF"), ["California", "Grand California"]
+        )
+        self.assertEqual(self.labels("mun"), ["Munich"])
+        self.assertEqual(
+            self.labels("c", limit="2"), ["California", "Coastal Cruiser"]
+        )
+        # Shared by two campervans, so it comes before single ones.
+        self.assertEqual(self.labels("v")[0], "Volkswagen")
+        self.assertEqual(self.labels(""), [])
+
+    def test_suggestions_are_memoised(self):
+        """Test that repeated prefixes skip the database."""
+        self.labels("nug")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.labels("nug"), ["Mountain Nugget", "Nugget"]
+            )
+
+    def test_suggestions_follow_campervan_changes(self):
+        """Test that saves and deletes refresh the terms."""
+        self.assertEqual(self.labels("munich"), ["Munich"])
+        van = Campervan.objects.get(name="Mountain Nugget")
+        van.location = "Berlin"
+        van.save()
+        self.assertEqual(self.labels("munich"), [])
+        self.assertEqual(self.labels("berl"), ["Berlin"])
+        van.delete()
+        self.assertEqual(self.labels("berl"), [])
+        self.assertFalse(SearchTerm.objects.filter(label="Ford").exists())
+
+    def test_saves_update_only_changed_terms(self):
+        """Test that a save adjusts the counts of the labels it changed
+        and leaves the other terms alone."""
+        before = set(SearchTerm.objects.values_list("id", flat=True))
+        van = Campervan.objects.get(name="Cosy Camper")
+        van.brand = "Ford"
+        van.save()
+        self.assertEqual(
+            dict(
+                SearchTerm.objects.filter(kind="brand").values_list(
+                    "label", "campervans"
+                )
+            ),
+            {"Volkswagen": 1, "Ford": 2},
+        )
+        self.assertTrue(
+            SearchTerm.objects.filter(label="Munich", id__in=before).exists()
+        )
+
+        # The management command rebuilds the same terms from scratch.
+        terms = set(
+            SearchTerm.objects.values_list(
+                "kind", "label", "normalized", "campervans"
+            )
+        )
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(
+            set(
+                SearchTerm.objects.values_list(
+                    "kind", "label", "normalized", "campervans"
+                )
+            ),
+            terms,
+        )
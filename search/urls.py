@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import suggest_view
+
+urlpatterns = [
+    path("suggest/", suggest_view, name="search_suggest"),
+]
@@ -1,3 +1,19 @@
-from django.shortcuts import render
+from django.http import JsonResponse
 
-# Create your views here.
+from .suggest import SUGGEST_LIMIT, suggest
+
+# Most suggestions a client may ask for
+MAX_SUGGEST_LIMIT = 20
+
+
+def suggest_view(request):
+    """
+    Autocomplete for the campervan search box: ?q=<prefix>[&limit=N].
+    """
+    query = request.GET.get("q", "")
+    limit = request.GET.get("limit", "")
+    if limit.isdigit():
+        limit = min(max(int(limit), 1), MAX_SUGGEST_LIMIT)
+    else:
+        limit = SUGGEST_LIMIT
+    return JsonResponse({"query": query, "suggestions": suggest(query, limit)})
@@ -1,3 +1,71 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from booking.models import Booking, BookingCancellationRequest
+from core.models import Campervan
 
-# Create your tests here.
+
+class MyBookingsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="bookinglist", password="password123"
+        )
+        self.client.login(username="bookinglist", password="password123")
+        self.campervan = Campervan.objects.create(
+            name="List Campervan",
+            description="Campervan for booking list testing.",
+            price_per_day=100.00,
+            image="test_image.jpg",
+            capacity=4,
+            location="Test Location",
+            brand="Test Brand",
+            model="Test Model",
+        )
+
+    def create_bookings(self, count, offset=0):
+        bookings = []
+        for i in range(offset, offset + count):
+            start = date.today() + timedelta(days=10 + i * 3)
+            booking = Booking.objects.create(
+                user=self.user,
+                campervan=self.campervan,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                total_price=200.00,
+                status="Confirmed",
+            )
+            booking.change_requests.create(
+                requested_start_date=start + timedelta(days=1),
+                requested_end_date=start + timedelta(days=3),
+            )
+            bookings.append(booking)
+        return bookings
+
+    def test_pending_cancel_flag(self):
+        """Test that bookings with a pending cancellation are flagged."""
+        flagged, other = self.create_bookings(2)
+        BookingCancellationRequest.objects.create(booking=flagged)
+        response = self.client.get(reverse("my_bookings"))
+        pending = {
+            b.id: b.pending_cancel for b in response.context["bookings"]
+        }
+        self.assertEqual(pending, {flagged.id: True, other.id: False})
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        """Test that the page costs the same queries for 2 or 10 bookings."""
+        self.create_bookings(2)
+        # Session, user, count, bookings and change requests.
+        with self.assertNumQueries(5):
+            self.client.get(reverse("my_bookings"))
+        self.create_bookings(8, offset=2)
+        with self.assertNumQueries(5):
+            self.client.get(reverse("my_bookings"))
+
+    def test_bookings_are_paginated(self):
+        """Test that bookings are split into pages of 10."""
+        self.create_bookings(12)
+        response = self.client.get(reverse("my_bookings"))
+        self.assertEqual(len(response.context["bookings"]), 10)
+        response = self.client.get(reverse("my_bookings"), {"page": 2})
+        self.assertEqual(len(response.context["bookings"]), 2)
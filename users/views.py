@@ -3,6 +3,8 @@ from django.utils.timezone import now
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
 from booking.models import Booking, BookingCancellationRequest
 from datetime import date
 
@@ -43,16 +45,24 @@ def my_bookings(request):
     """
     Show users bookings
     """
-    bookings = Booking.objects.filter(user=request.user).order_by(
-        "-start_date"
+    bookings = (
+        Booking.objects.filter(user=request.user)
+        .select_related("campervan")
+        .prefetch_related("change_requests")
+        # Flag to hide cancellation request button
+        # if status of booking = "Rejected" or "Pending"
+        .annotate(
+            pending_cancel=Exists(
+                BookingCancellationRequest.objects.filter(
+                    booking=OuterRef("pk"), status="Pending"
+                )
+            )
+        )
+        .order_by("-start_date", "-id")
     )
 
-    # Flag to hide cancellation request button
-    # if status of booking = "Rejected" or "Pending"
-    for booking in bookings:
-        booking.pending_cancel = booking.cancellation_requests.filter(
-            status="Pending"
-        ).exists()
+    paginator = Paginator(bookings, 10)
+    bookings = paginator.get_page(request.GET.get("page"))
 
     context = {
         "bookings": bookings,